@@ -1,12 +1,24 @@
 from rest_framework import serializers
 
-from bson import ObjectId
+from bson import ObjectId, Binary
 
 import datetime
+import json
+import zlib
+import lzma
+import sys
+import array
+import struct
+import math
+from numbers import Real
 try:
     import jdatetime
 except:
     pass
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class TimestampField(serializers.Field):
@@ -110,6 +122,208 @@ class IdMongoField(serializers.Field):
         if not bool(update_phase):
             return ObjectId()
         if update_add_phase:  # add(push) a document to a serializer field in update phase
-            return ObjectId()
+            _id = ObjectId()
+            # in saving, distinguishes added documents from edited ones (their _id provided by user)
+            self.context.setdefault('added_ids', set()).add(_id)
+            return _id
         if type(data) == str:  # 'data' could be True/False returned from get_value
             return ObjectId(data)
+
+
+class CompressibleText(str):   # validated value of CompressedField, compressed in serializing (saving)
+    pass
+
+
+class CompressibleDict(dict):
+    pass
+
+
+class CompressibleList(list):
+    pass
+
+
+class CompressedBinary(Binary):
+    # compressed (or packed) value saved in db, 'value' is the original value (so the response of save() shows it, not
+    # the bytes)
+    def __new__(cls, data, subtype, value=None):
+        binary = super().__new__(cls, data, subtype)
+        binary.value = value
+        return binary
+
+
+class CompressedField(serializers.Field):
+    # large text (or json value if json=True, like dict) saved in db as compressed Binary by 'method' ('zlib' or
+    # 'lzma'), if its size is at least 'min_size' bytes, and decompressed in reading. not compressed values (smaller,
+    # or saved before) are read as they are. it's not fetched by MongoSerializer.find_page/find_one unless passed in
+    # their 'include' (or lazy=False)
+    methods = {'zlib': 128, 'lzma': 129}    # user defined subtype of Binary, so values are decompressed by their method
+    default_error_messages = {
+        'invalid': 'Not a valid string.',
+        'invalid_json': 'Value must be valid JSON.',
+    }
+
+    def __init__(self, method='zlib', level=None, min_size=1024, json=False, lazy=True, *args, **kwargs):
+        if method not in self.methods:
+            raise ValueError(f"method should be 'zlib' or 'lzma', but provided: {method}")
+        self.method = method
+        self.level = level      # default is 6 for both (zlib level 0-9, lzma preset 0-9)
+        self.min_size = min_size
+        self.json = json
+        self.lazy = lazy
+        super().__init__(*args, **kwargs)
+
+    def to_internal_value(self, data):
+        if not self.json:
+            if not isinstance(data, str):
+                self.fail('invalid')
+            return CompressibleText(data)
+        try:
+            json.dumps(data)
+        except (TypeError, ValueError):
+            self.fail('invalid_json')
+        if isinstance(data, dict):
+            return CompressibleDict(data)
+        return CompressibleList(data) if isinstance(data, list) else data    # numbers, ... not compressed
+
+    def to_representation(self, value):
+        if isinstance(value, (CompressibleText, CompressibleDict, CompressibleList)):   # validated_data (saving)
+            return self.compress(value)
+        if isinstance(value, Binary) and value.subtype in self.methods.values():     # taken from db
+            return self.decompress(value)
+        return value
+
+    def compress(self, value):
+        data = (value if isinstance(value, str) else json.dumps(value, separators=(',', ':'))).encode()
+        original = str(value) if isinstance(value, str) else dict(value) if isinstance(value, dict) else list(value)
+        if len(data) < self.min_size:
+            return original
+        level = 6 if self.level is None else self.level
+        data = zlib.compress(data, level) if self.method == 'zlib' else lzma.compress(data, preset=level)
+        return CompressedBinary(data, self.methods[self.method], original)
+
+    def decompress(self, value):
+        data = zlib.decompress(value) if value.subtype == self.methods['zlib'] else lzma.decompress(value)
+        return json.loads(data) if self.json else data.decode()
+
+
+class PackableArray(array.array):    # validated value of PackedArrayField, packed in serializing (saving)
+    shape = None
+
+    def tolist(self):    # nested lists by shape (used by json encoders)
+        if self.shape is None or len(self.shape) < 2 or not all(self.shape):
+            return super().tolist()
+        return memoryview(self).cast('B').cast(self.typecode, self.shape).tolist()
+
+
+class PackedArrayField(serializers.Field):
+    # list of numbers (nested lists for more dimensions, like [[1, 2], [3, 4]]) saved in db as one Binary: a small
+    # header (dtype and shape) and values packed as 'dtype' (little endian), instead of a BSON double for each one.
+    # read as numpy array if numpy installed (otherwise memoryview), without copying the values of the Binary.
+    # output could be 'numpy', 'memoryview', 'array' (array.array, flat) or 'list'. 'shape' like (768,) or (None, 3)
+    # validates the shape. lists saved before (not packed) are read as they are
+    subtype = 130     # user defined subtype of Binary
+    dtypes = {'int8': 'b', 'uint8': 'B', 'int16': 'h', 'uint16': 'H', 'int32': 'i', 'uint32': 'I', 'int64': 'q',
+              'uint64': 'Q', 'float32': 'f', 'float64': 'd'}
+    default_error_messages = {
+        'invalid': 'Expected a list of numbers but got type "{input_type}".',
+        'not_a_number': 'All items must be numbers.',
+        'not_an_integer': 'All items must be integers for {dtype}.',
+        'not_rectangular': 'All nested lists must have the same length.',
+        'out_of_range': 'A value is out of range of {dtype}.',
+        'shape': 'Expected shape {shape} but got {input_shape}.',
+    }
+
+    def __init__(self, dtype='float64', shape=None, output=None, *args, **kwargs):
+        if dtype not in self.dtypes:
+            raise ValueError(f"dtype should be one of {', '.join(self.dtypes)}, but provided: {dtype}")
+        if output not in (None, 'numpy', 'memoryview', 'array', 'list') or output == 'numpy' and numpy is None:
+            raise ValueError(f"output should be 'numpy' (numpy installed), 'memoryview', 'array' or 'list', but provided: {output}")
+        self.dtype = dtype
+        self.typecode = self.dtypes[dtype]
+        self.shape = tuple(shape) if shape is not None else None
+        self.output = output or ('numpy' if numpy is not None else 'memoryview')
+        super().__init__(*args, **kwargs)
+
+    def to_internal_value(self, data):
+        if numpy is not None and isinstance(data, numpy.ndarray):
+            if not data.ndim:
+                self.fail('invalid', input_type=type(data).__name__)
+            if data.dtype.kind not in 'iuf':
+                self.fail('not_a_number')
+            shape, values = data.shape, data.ravel().tolist()
+        elif isinstance(data, (list, tuple, array.array)):
+            shape, values = self.flatten(data)
+        else:
+            self.fail('invalid', input_type=type(data).__name__)
+        if self.shape is not None and (len(shape) != len(self.shape) or
+                                       any(size is not None and size != length for size, length in zip(self.shape, shape))):
+            self.fail('shape', shape=self.shape, input_shape=shape)
+        if self.typecode not in 'fd' and any(not float(value).is_integer() for value in values if type(value) is not int):
+            self.fail('not_an_integer', dtype=self.dtype)
+        try:
+            if self.typecode not in 'fd' and any(type(value) is not int for value in values):
+                values = [int(value) for value in values]
+            packable = PackableArray(self.typecode, values)
+        except (OverflowError, TypeError):
+            self.fail('out_of_range', dtype=self.dtype)
+        # float32 packs too large values as inf (instead of raising OverflowError)
+        if self.typecode == 'f' and math.inf in map(abs, packable) and \
+                any(math.isinf(packed) and not math.isinf(value) for packed, value in zip(packable, values)):
+            self.fail('out_of_range', dtype=self.dtype)
+        packable.shape = shape
+        return packable
+
+    def flatten(self, data):
+        # (shape, flat values) of nested lists
+        shape, level = [len(data)], data
+        while level and isinstance(level[0], (list, tuple)):
+            shape.append(len(level[0]))
+            if any(not isinstance(item, (list, tuple)) or len(item) != shape[-1] for item in level):
+                self.fail('not_rectangular')
+            level = [value for item in level for value in item]
+        # checked by types of the values (not each value), bool is subclass of int
+        if any(issubclass(kind, bool) or not issubclass(kind, Real) for kind in set(map(type, level))):
+            self.fail('not_a_number')
+        return tuple(shape), level
+
+    def to_representation(self, value):
+        if isinstance(value, PackableArray):     # validated_data (saving)
+            return self.pack(value)
+        if isinstance(value, Binary) and value.subtype == self.subtype:     # taken from db
+            return self.unpack(value)
+        return value
+
+    def pack(self, value):
+        # header: version, typecode, ndim, reserved, size of each dimension (uint32), padded to 8 bytes so values
+        # are aligned
+        ndim = len(value.shape)
+        header = struct.pack(f'<BcBx{ndim}I', 1, value.typecode.encode(), ndim, *value.shape)
+        header += bytes(-len(header) % 8)
+        values = value
+        if sys.byteorder == 'big':
+            values = array.array(value.typecode, value)
+            values.byteswap()
+        return CompressedBinary(header + values.tobytes(), self.subtype, value)
+
+    def unpack(self, value):
+        typecode, ndim = chr(value[1]), value[2]
+        shape = struct.unpack_from(f'<{ndim}I', value, 4)
+        data, offset = value, 4 + 4 * ndim + (-(4 + 4 * ndim) % 8)
+        if self.output == 'numpy':
+            return numpy.frombuffer(data, dtype=numpy.dtype(typecode).newbyteorder('<'), offset=offset).reshape(shape)
+        if sys.byteorder == 'big':    # values are copied to swap their bytes
+            values = array.array(typecode)
+            values.frombytes(memoryview(data)[offset:])
+            values.byteswap()
+            data, offset = values.tobytes(), 0
+        if self.output == 'array':      # array.array can't use the buffer of the Binary, so values are copied (flat)
+            values = array.array(typecode)
+            values.frombytes(memoryview(data)[offset:])
+            return values
+        view = self.get_view(data, offset, typecode, shape)
+        return view.tolist() if self.output == 'list' else view
+
+    def get_view(self, data, offset, typecode, shape):
+        # memoryview of the values in 'data' by 'shape' (flat if it's empty, memoryview can't have zero dimensions)
+        view = memoryview(data)[offset:]
+        return view.cast(typecode, shape) if all(shape) else view.cast(typecode)
@@ -0,0 +1,167 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import json
+import os
+
+from ...methods import ObjectIdJSONEncoder
+
+
+def get_shards(path, count):
+    # byte ranges of the file like: [(0, 10485760), (10485760, 20971520), ...], every shard starts at start of a line
+    size = os.path.getsize(path)
+    offsets = [0]
+    with open(path, 'rb') as file:
+        for index in range(1, count):
+            file.seek(max(size * index // count, offsets[-1]))
+            if file.tell():
+                file.readline()       # rest of the line belongs to previous shard
+            offsets.append(min(file.tell(), size))
+    offsets.append(size)
+    return [(start, end) for start, end in zip(offsets, offsets[1:]) if start < end]
+
+
+def read_shard(file, end, offsets):
+    # lines of the file until 'end' (file is at start of a line), 'offsets' gets byte offset of each read line
+    while file.tell() < end:
+        offset = file.tell()
+        line = file.readline()
+        if not line:
+            break
+        offsets.append(offset)
+        yield line
+
+
+def write_json(path, data):     # replaced at once, so a crash doesn't leave a half written checkpoint
+    with open(path + '.tmp', 'w') as file:
+        json.dump(data, file)
+    os.replace(path + '.tmp', path)
+
+
+def setup_worker():
+    # every worker is a new process (spawn), so has its own django setup and MongoClient (created by importing the
+    # serializer's module), a MongoClient is not safe to use across fork
+    import django
+    django.setup()
+
+
+def import_shard(serializer_path, path, shard, start, end, directory, chunk_size):
+    # validates and inserts the lines of a shard via .ingest(), chunk by chunk. after each chunk, the position in the
+    # file and the counts saved in the checkpoint of the shard, so rerun continues from the last saved chunk
+    serializer_class = import_string(serializer_path)
+    checkpoint_path = os.path.join(directory, f'{shard}.json')
+    errors_path = os.path.join(directory, f'{shard}.errors.ndjson')
+    checkpoint = {'start': start, 'end': end, 'position': start, 'documents': 0, 'inserted': 0, 'invalid': 0,
+                  'errors_size': 0}
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path) as file:
+            checkpoint = json.load(file)
+    with open(errors_path, 'a') as errors_file:
+        errors_file.truncate(checkpoint['errors_size'])   # errors of the chunk not saved in checkpoint (crashed)
+    with open(path, 'rb') as file, open(errors_path, 'a') as errors_file:
+        file.seek(checkpoint['position'])
+        offsets, base = [], 0    # byte offset of the lines of current chunk, 'base' is index of offsets[0]
+        for result in serializer_class.ingest(read_shard(file, end, offsets), chunk_size=chunk_size):
+            # errors are by byte offset of the line in the file (line numbers of a shard are unknown to others)
+            for index, errors in result['errors'].items():
+                offset = offsets[index - base]
+                errors_file.write(json.dumps({'offset': offset, 'errors': errors}, cls=ObjectIdJSONEncoder) + '\n')
+            errors_file.flush()
+            checkpoint.update(position=file.tell(), documents=checkpoint['documents'] + result['count'],
+                              inserted=checkpoint['inserted'] + result['inserted'],
+                              invalid=checkpoint['invalid'] + len(result['errors']), errors_size=errors_file.tell())
+            write_json(checkpoint_path, checkpoint)
+            base += len(offsets)
+            del offsets[:]
+    checkpoint['position'] = end
+    write_json(checkpoint_path, checkpoint)
+    return shard, checkpoint
+
+
+class Command(BaseCommand):
+    help = ('Imports a NDJSON file (a json document per line) by a MongoSerializer in several processes. The file is '
+            'split to byte ranges (shards), every shard validated and inserted by .ingest() in a worker process. '
+            'Progress of every shard is checkpointed, so running the command again continues a crashed import.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('serializer', help="dotted path of the serializer, like: 'blog.serializers.BlogMongoSerializer'")
+        parser.add_argument('file', help='path of the NDJSON file')
+        parser.add_argument('--processes', type=int, default=os.cpu_count(), help='count of worker processes')
+        parser.add_argument('--shards', type=int, default=None, help='count of shards, default 4 per process')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='documents validated and inserted together')
+        parser.add_argument('--checkpoint-dir', default=None, help="default '<file>.import'")
+        parser.add_argument('--restart', action='store_true', help='discard checkpoints and import from start')
+
+    def handle(self, serializer, file, processes, shards, chunk_size, checkpoint_dir, restart, **options):
+        try:
+            import_string(serializer)
+        except ImportError as e:
+            raise CommandError(e)
+        if not os.path.isfile(file):
+            raise CommandError(f'file "{file}" does not exist')
+        directory = checkpoint_dir or f'{file}.import'
+        os.makedirs(directory, exist_ok=True)
+        plan_path = os.path.join(directory, 'shards.json')
+        stat = os.stat(file)
+        plan = None
+        if os.path.exists(plan_path) and not restart:
+            with open(plan_path) as plan_file:
+                plan = json.load(plan_file)
+            if (plan['serializer'], plan['size'], plan['mtime']) != (serializer, stat.st_size, stat.st_mtime):
+                raise CommandError(f'checkpoints of "{directory}" are of another file or serializer, use --restart')
+        if plan is None:   # new import
+            for name in os.listdir(directory):
+                if name.endswith(('.json', '.ndjson')):
+                    os.remove(os.path.join(directory, name))
+            plan = {'serializer': serializer, 'size': stat.st_size, 'mtime': stat.st_mtime,
+                    'shards': get_shards(file, shards or processes * 4)}
+            write_json(plan_path, plan)
+
+        checkpoints = {}
+        pending = []
+        for shard, (start, end) in enumerate(plan['shards']):
+            checkpoint_path = os.path.join(directory, f'{shard}.json')
+            checkpoint = None
+            if os.path.exists(checkpoint_path):
+                with open(checkpoint_path) as checkpoint_file:
+                    checkpoint = json.load(checkpoint_file)
+            if checkpoint and checkpoint['position'] >= end:
+                checkpoints[shard] = checkpoint     # done in previous run
+            else:
+                pending.append((shard, start, end))
+        if len(pending) < len(plan['shards']):
+            self.stdout.write(f'{len(plan["shards"]) - len(pending)} of {len(plan["shards"])} shards already imported')
+
+        # spawn (instead fork) so workers don't share MongoClient and db connections of this process
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max(processes, 1), mp_context=context, initializer=setup_worker) as executor:
+            futures = {executor.submit(import_shard, serializer, os.path.abspath(file), shard, start, end, directory,
+                                       chunk_size): shard for shard, start, end in pending}
+            failed = {}    # shard: exception, other shards continue
+            for future in as_completed(futures):
+                try:
+                    shard, checkpoint = future.result()
+                except BrokenProcessPool:
+                    raise CommandError('a worker process crashed, run the command again to continue from checkpoints')
+                except Exception as e:
+                    failed[futures[future]] = e
+                    self.stderr.write(f'shard {futures[future]} failed: {e!r}')
+                    continue
+                checkpoints[shard] = checkpoint
+                self.stdout.write(f'shard {shard}: {checkpoint["documents"]} documents, {checkpoint["inserted"]} '
+                                  f'inserted, {checkpoint["invalid"]} invalid')
+        if failed:
+            shards_failed = ', '.join(f'{shard} ({e!r}, checkpoint: {os.path.join(directory, f"{shard}.json")})'
+                                      for shard, e in sorted(failed.items()))
+            raise CommandError(f'{len(checkpoints)} of {len(plan["shards"])} shards imported, failed shards: '
+                               f'{shards_failed}. run the command again to continue from checkpoints')
+
+        documents = sum(checkpoint['documents'] for checkpoint in checkpoints.values())
+        inserted = sum(checkpoint['inserted'] for checkpoint in checkpoints.values())
+        invalid = sum(checkpoint['invalid'] for checkpoint in checkpoints.values())
+        self.stdout.write(self.style.SUCCESS(f'{documents} documents, {inserted} inserted, {invalid} invalid'))
+        if invalid:
+            self.stdout.write(f'errors of invalid documents (by byte offset of their line): {directory}/*.errors.ndjson')
@@ -1,15 +1,47 @@
 from django.utils.translation import activate, get_language
+from django.http import StreamingHttpResponse
+from django.core.cache import caches
+
+from asgiref.sync import sync_to_async
 
 from rest_framework import serializers
 from rest_framework.response import Response
-from rest_framework.parsers import JSONParser
 from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
 from rest_framework.validators import UniqueValidator
-import io
+from rest_framework.settings import api_settings
 import json
-from bson import ObjectId
-from collections.abc import Iterable
-from pymongo import UpdateOne
+import base64
+import struct
+import sys
+import asyncio
+import inspect
+import threading
+import atexit
+import logging
+import time
+import uuid
+import bson
+from bson import ObjectId, Decimal128
+from bson.errors import InvalidBSON
+from bson.raw_bson import RawBSONDocument
+from collections import OrderedDict
+from contextvars import ContextVar
+from collections.abc import Iterable, Mapping
+from pymongo import InsertOne, UpdateOne, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from .fields import CompressedBinary
+try:
+    import jdatetime
+except ImportError:
+    jdatetime = None
+try:
+    import greenlet
+except ImportError:
+    greenlet = None
+
+logger = logging.getLogger(__name__)
 
 
 def call_back_serializer_id(data):
@@ -51,11 +83,8 @@ def call_back_deserializer_id(data):
 
 
 def get_parsed_data(data):  # will be depracated
-    # data type is dict
-    data = call_back_serializer_id(data)
-    content = JSONRenderer().render(data)
-    stream = io.BytesIO(content)
-    parsed = JSONParser().parse(stream)
+    # data type is dict, mongo values encoded in one pass by ObjectIdJSONEncoder (without changing 'data' itself)
+    parsed = json.loads(json.dumps(data, cls=ObjectIdJSONEncoder))
     parsed = call_back_deserializer_id(parsed)
     return parsed
 
@@ -75,146 +104,1150 @@ def get_mongo_get_query(serializer):  # for query like: "comments.$.author.profi
             queries[f'{serializer_query[:i + 1]}_id'] = parent._id
 
 
-def save_to_mongo(serializer, _id=None, id=None, data=None, root_id=None):
+# async support: sync code of the serializers (validation, serialization, saving) runs in a greenlet by run_async(),
+# db calls return awaitable for async collections (like pymongo's AsyncCollection or motor), resolve() sends it to
+# run_async() to await, so sync and async methods (like save() and asave()) share the same code
+if greenlet:
+    class AsyncGreenlet(greenlet.greenlet):
+        def __init__(self, run, driver):
+            super().__init__(run, driver)
+            self.driver = driver
+            self.gr_context = driver.gr_context   # contextvars (like django's active language) same as the caller
+
+
+async def run_async(function, *args, **kwargs):
+    # runs sync 'function' and awaits db calls of it, returns result of the function
+    if greenlet is None:
+        raise ImportError("async methods require 'greenlet', install like: pip install mongoserializer[async]")
+    context = AsyncGreenlet(function, greenlet.getcurrent())
+    result = context.switch(*args, **kwargs)
+    while not context.dead:     # result is an awaitable sent by resolve()
+        try:
+            value = await result
+        except BaseException:
+            result = context.throw(*sys.exc_info())
+        else:
+            result = context.switch(value)
+    return result
+
+
+def in_async():   # is running inside run_async()
+    return greenlet is not None and isinstance(greenlet.getcurrent(), AsyncGreenlet)
+
+
+def resolve(value):
+    # result of a db call, awaited if it's awaitable (async collection, only inside run_async)
+    if not inspect.isawaitable(value):
+        return value
+    if not in_async():
+        if inspect.iscoroutine(value):
+            value.close()
+        raise RuntimeError('async collection should be used via async methods (like ais_valid(), asave())')
+    return greenlet.getcurrent().driver.switch(value)
+
+
+def resolve_all(calls):
+    # runs db calls (functions without argument) together, returns result or raised exception of each call. inside
+    # run_async() each call runs in its own greenlet and all of them awaited concurrently via asyncio.gather
+    if in_async():
+        return resolve(asyncio.gather(*(run_async(lambda call=call: resolve(call())) for call in calls),
+                                      return_exceptions=True))
+    results = []
+    for call in calls:
+        try:
+            results.append(resolve(call()))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def resolve_sync(function, *args):
+    # blocking calls (like django orm queries), ran in a thread via sync_to_async inside run_async(), because django
+    # doesn't allow them in the event loop
+    if in_async():
+        return resolve(sync_to_async(function)(*args))
+    return function(*args)
+
+
+def fetch_all(cursor):   # documents of sync or async cursor as list
+    to_list = getattr(cursor, 'to_list', None)
+    return resolve(to_list(None)) if to_list else list(cursor)
+
+
+def save_to_mongo(serializer, _id=None, id=None, data=None, root_id=None, update=None, query=None):
     # '_id' is id of serializer, could be main serializer's id or nested serializer's id
     # 'root_id' is id of main serializer, is None when serializer==main serializer, only available for nested serializer
-    # push for ArrayFields should be done manually, push in two level nested (blog.profiles.comments) not supported
+    # 'update' (MongoUpdate) collects the update of main and nested fields of a document instead of saving them
+    # separately, save_to_mongo(serializer, update=update) (without data) saves whole of them by one update_one
+    # 'update' could be list of MongoUpdate (several documents), saved via bulk_write and returns result of each one
+    # push for ArrayFields should be done manually, without 'update', edit in two level nested (blog.comments.replies)
+    # not supported. 'query' is like ('comments.$.', 'add_array') (query of the call), serializer.query by default
 
-    collection, query = serializer.mongo_collection, serializer.query
+    collection, query = serializer.mongo_collection, query or serializer.query
+    work = unit_of_work.get()    # inside UnitOfWork, writes are deferred to the end of it
     language_code = get_language()
     activate('en')
+    if data is None and update is not None:
+        if isinstance(update, list):
+            update = _save_updates(collection, update, getattr(serializer, 'batch_size', 1000))
+        elif getattr(serializer, 'write_behind', None) is not None and work is None and \
+                serializer.write_behind.add(collection, update, getattr(serializer, 'write_behind_fields', None)):
+            pass    # saved later by the buffer
+        elif _save_update(collection, update) == 0 and update.version:
+            activate(language_code)
+            raise serializers.ValidationError({update.version[0]: [VERSION_CONFLICT_MESSAGE]})
+        activate(language_code)
+        return update
+
+    writes = update if update is not None else MongoUpdate(root_id or _id)
+    errors = None    # duplicate key errors of upsert
     if isinstance(data, dict):
         if not root_id:
-            if not _id and not id:   # creation phase
-                collection.insert_one(data)
+            if not _id and not id and getattr(serializer, 'natural_key', None) and work is not None:
+                # _id is not known, so bounded arrays are not sliced here, the next save outside it does
+                work.add(collection, [UpdateOne(*_upsert_operation(serializer, data), upsert=True)])
+                evict_cache(collection)
+            elif not _id and not id and getattr(serializer, 'natural_key', None):  # creation phase, upsert by natural key
+                overflow = _bound_created(serializer, [data])
+                try:
+                    # _id of the existing document (if matched one) is returned, instead of _id of data
+                    document = resolve(collection.find_one_and_update(*_upsert_operation(serializer, data), {'_id': 1},
+                                                                      upsert=True, return_document=ReturnDocument.AFTER))
+                    if document['_id'] != data.get('_id'):
+                        data['_id'] = document['_id']
+                        evict_cache(collection)
+                    _save_created_overflow(serializer, [data], overflow)
+                except DuplicateKeyError as e:
+                    errors = _duplicate_key_errors(e.details)
+            elif not _id and not id:   # creation phase
+                overflow = _bound_created(serializer, [data])
+                if work is not None:
+                    work.add(collection, [InsertOne(data)])
+                else:
+                    resolve(collection.insert_one(data))
+                _save_created_overflow(serializer, [data], overflow)
             elif id and _id:  # update django field (only main fields not nested)
-                collection.update_one({"_id": ObjectId(_id)}, {"$set": {query[0][:-1]: data}})
+                writes.set[query[0][:-1]] = data
             elif _id:      # update main document, non nested documents. if root_id == _id, root_id is None
-                query_set = {f'{query[0]}{attr}': value for attr, value in data.items()}
-                collection.update_one({'_id': ObjectId(_id)}, {"$set": query_set})
+                writes.add_set(query[0], data)
 
         else:      # update nested documents
             # _id could be created by IdMongoField, so its not good identifier instead 'add'
             if query[1] == 'add_array':    # append to the nested array field (like to blog1.comments)
                 query_push = query[0][:-3] if query[0][-2] == '$' else query[0][:-1]
-                collection.update_one({'_id': ObjectId(root_id)}, {"$push": {query_push: data}})
+                writes.add_push(query_push, data)
             elif query[1] == 'add_dict':    # add to the blank nested dict field or reset (like to blog1.profile)
-                query_set = {f'{query[0]}{attr}': value for attr, value in data.items()}
-                collection.update_one({'_id': ObjectId(root_id)}, {"$set": query_set})
+                writes.add_set(query[0], data)
             elif query[1] == 'edit':          # edit the nested document
-                query_set = {f'{query[0]}{attr}': value for attr, value in data.items()}
-                get_query = query[0].replace('.$', '')
-                if _id:
-                    collection.update_one({'_id': ObjectId(root_id), f"{get_query}_id": ObjectId(_id)}, {"$set": query_set})
-                else:  # just to be safe
-                    collection.update_one({'_id': ObjectId(root_id)}, {"$set": query_set})
-        activate(language_code)
+                # with 'update', query[0] of nested array documents is like 'comments.$[a0].' (matched by arrayFilters)
+                if _id and update is None:   # otherwise set without matching (just to be safe)
+                    get_query = query[0].replace('.$', '')
+                    writes.filter[f"{get_query}_id"] = ObjectId(_id)
+                writes.add_set(query[0], data)
 
     elif isinstance(data, list):
         if id:          # django fields level 1. if document not exists in db push, otherwise refresh
-            updates = []
+            get_query = query[0].replace('.$', '')
             for i, item in zip(id, data):
-                get_query = query[0].replace('.$', '')
-                query_set = {f'{query[0]}{attr}': value for attr, value in item.items()}
-                updates.append(UpdateOne(
-                    {"_id": ObjectId(_id), f"{get_query}id": i}, {"$set": {query[0][:-1]: dict(item)}},
-                    upsert=False)
+                writes.operations.append(
+                    ({"_id": ObjectId(writes.root_id), f"{get_query}id": i}, {"$set": {query[0][:-1]: dict(item)}})
                 )
-                updates.append(UpdateOne(
-                    {"_id": ObjectId(_id), f"{get_query}id": {'$ne': i}}, {"$push": {query[0][:-3]: dict(item)}},
-                    upsert=False)
+                writes.operations.append(
+                    ({"_id": ObjectId(writes.root_id), f"{get_query}id": {'$ne': i}}, {"$push": {query[0][:-3]: dict(item)}})
                 )
-            if updates:
-                collection.bulk_write(updates)
 
-        elif not _id:
-            collection.insert_many(data)
+        elif not _id and getattr(serializer.child, 'natural_key', None):   # upsert by natural key
+            # inside UnitOfWork _id is not known, so bounded arrays are not sliced, the next save outside it does
+            overflow = _bound_created(serializer.child, data) if work is None else {}
+            errors = _upsert_many(collection, serializer.child, data, getattr(serializer, 'batch_size', 1000))
+            evict_cache(collection)
+            _save_created_overflow(serializer.child, data, overflow, errors)
+            errors = errors and [errors.get(index, {}) for index in range(len(data))]
+        elif not _id and work is not None:     # errors (like duplicate key) raised by UnitOfWork at the end
+            overflow = _bound_created(serializer.child, data)
+            work.add(collection, [InsertOne(document) for document in data])
+            _save_created_overflow(serializer.child, data, overflow)
+        elif not _id and getattr(serializer, 'ordered', True) and not getattr(serializer, 'partial_success', False):
+            overflow = _bound_created(serializer.child, data)
+            try:
+                resolve(collection.insert_many(data))
+            except BulkWriteError as e:     # documents before the failed one are inserted
+                _save_created_overflow(serializer.child, data, overflow, range(e.details.get('nInserted', 0), len(data)))
+                raise
+            _save_created_overflow(serializer.child, data, overflow)
+        elif not _id:      # failure of a document doesn't stop others, errors raised by index of the documents
+            overflow = _bound_created(serializer.child, data)
+            try:
+                resolve(collection.insert_many(data, ordered=False))
+            except BulkWriteError as e:
+                errors = {}
+                for error in e.details.get('writeErrors', []):
+                    if error.get('code') == 11000:
+                        errors[error['index']] = _duplicate_key_errors(error)
+                    else:
+                        errors[error['index']] = {api_settings.NON_FIELD_ERRORS_KEY: [error.get('errmsg')]}
+                _save_created_overflow(serializer.child, data, overflow, errors)
+                errors = [errors.get(index, {}) for index in range(len(data))]
+            else:
+                _save_created_overflow(serializer.child, data, overflow)
         else:
             raise ValueError('update not implemented')
-        activate(language_code)
+    if update is None:
+        _save_update(collection, writes)
+    activate(language_code)
+    if errors:
+        raise serializers.ValidationError(errors)
     return data
 
 
-# convert dict to object like: DictToObject({'spec': {'age': 22}}).spec.age==22, can also use list
-class DictToObject:
-    # 'data' can be dict or list of dicts (pass many=True)
-    # if a serializer fields are 'a', 'b' and only 'a' provided in data, all_fields make b=None to prevent error
-    def __init__(self, data, many=None, all_fields=None):
-        self.items = None     # used in repr
-        instance = CallBack(data=data)
-        # we set self.sub_counter and self.data, to DictToObject (need in def repr, ...)
-        for attr_name, attr_value in instance.__dict__.items():
-            setattr(self, attr_name, attr_value)
-        if isinstance(data, dict):   # data is dict
-            if all_fields:
-                # {'_id': None} will cause saving _id=None is db (in PostMongoSerializer)
-                if all_fields.get('_id'):
-                    del all_fields['_id']
-                [setattr(instance, field, None) for field in all_fields if field not in data]
-        # manage list and MongoDB cursor (col.find(....))
-        elif isinstance(data, Iterable) and not isinstance(data, (str, bytes)):
-            if not many:
-                raise ValueError("class DictToObject: Iterable data type, pass 'many=True' to fix")
-            if all_fields:
-                for obj, dic in zip(instance, list(data)):
-                    [setattr(obj, field, None) for field in all_fields if field not in dic]
-            self.items = instance.items
+def _upsert_many(collection, serializer, documents, batch_size):
+    # documents are upserted via bulk_write(ordered=False) matched by natural key fields (Meta.natural_key) of
+    # serializer, instead of validating unique and inserting them separately. returns duplicate key errors by index.
+    # _id of a document that updated an existing document is replaced by _id of that document (queried after)
+    errors = {}
+    work = unit_of_work.get()
+    if work is not None:
+        work.add(collection, [UpdateOne(*_upsert_operation(serializer, document), upsert=True) for document in documents])
+        return errors
+    starts = range(0, len(documents), batch_size)
+    matched = []    # documents updated an existing document
+    operations = [[UpdateOne(*_upsert_operation(serializer, document), upsert=True)
+                   for document in documents[start:start + batch_size]] for start in starts]
+    # batches sent together (concurrently for async collection)
+    results = resolve_all([lambda batch=batch: collection.bulk_write(batch, ordered=False) for batch in operations])
+    for start, result in zip(starts, results):
+        batch = documents[start:start + batch_size]
+        if isinstance(result, BulkWriteError):
+            e = result
+            upserted = {item['index']: item['_id'] for item in e.details.get('upserted', [])}
+            for error in e.details.get('writeErrors', []):
+                if error.get('code') == 11000:
+                    errors[start + error['index']] = _duplicate_key_errors(error)
+                else:
+                    errors[start + error['index']] = {api_settings.NON_FIELD_ERRORS_KEY: [error.get('errmsg')]}
+        elif isinstance(result, Exception):
+            raise result
         else:
-            raise ValueError("Unsupported data type for conversion: must be dict or list of dicts")
+            upserted = result.upserted_ids
+        for index, document in enumerate(batch):
+            if index not in upserted and start + index not in errors:
+                matched.append(document)
+    for start in range(0, len(matched), batch_size):
+        _set_matched_ids(collection, serializer.natural_key, matched[start:start + batch_size])
+    return errors
 
-    def __getitem__(self, key):
-        if hasattr(self, "items"):
-            return self.items[key]
+
+def _set_matched_ids(collection, natural_key, documents):
+    # sets _id of existing documents matched by natural key of 'documents' (updated by upsert) to them
+    filters = [{key: document.get(key) for key in natural_key} for document in documents]
+    if len(natural_key) == 1:
+        query = {natural_key[0]: {'$in': [filter[natural_key[0]] for filter in filters]}}
+    else:
+        query = {'$or': filters}
+    ids = {repr(tuple(existing.get(key) for key in natural_key)): existing['_id'] for existing in
+           fetch_all(collection.find(query, {'_id': 1, **{key: 1 for key in natural_key}}))}
+    for document, filter in zip(documents, filters):
+        _id = ids.get(repr(tuple(filter.values())))
+        if _id is None:
+            document.pop('_id', None)
         else:
-            raise TypeError("Index access is not supported on this object")
+            document['_id'] = _id
 
-    def __repr__(self):
-        if self.sub_counter == 1:
-            # in mongo cursor (.find()) self.data don't show actual data and needs to self.items
-            data = self.items if self.items else self.data
-            return f'Class {self.__class__.__name__}: ' + repr(data)
-        return repr(self.data)
 
+def _upsert_operation(serializer, document):
+    # returns filter and update of upserting the document, _id and auto_now_add fields only saved in insert
+    natural_key, insert_only = serializer.natural_key, serializer.field_plan.insert_only
+    update = {'$set': {key: value for key, value in document.items() if key not in insert_only and key not in natural_key},
+              '$setOnInsert': {key: document[key] for key in insert_only if key in document}}
+    return {key: document.get(key) for key in natural_key}, {operator: value for operator, value in update.items() if value}
+
+
+def _duplicate_key_errors(details):
+    # convert duplicate key error (E11000) of mongo to validation errors of the fields, like: {'slug': ['...']}
+    details = details or {}
+    if not details.get('keyPattern'):
+        return {api_settings.NON_FIELD_ERRORS_KEY: [details.get('errmsg') or 'Duplicate key error.']}
+    return {field: [f'The {field} must be unique.'] for field in details['keyPattern']}
+
+
+def _save_update(collection, update):
+    # operations (like refreshing django list fields or a $push conflicting with a $set) can't be merged into one
+    # update document, so if there is any, all of them sent together via one bulk_write. returns count of matched
+    # (None if deferred by UnitOfWork)
+    operations = update._get_operations()
+    if not operations:
+        return 0
+    work = unit_of_work.get()
+    if work is not None:    # pushes to bounded arrays are not sliced here, the next save outside it does
+        work.add(collection, update.get_operations(), update)
+        evict_cache(collection, [update.root_id])
+        return None
+    if update.get_bounded_paths():
+        return _save_bounded(collection, update, operations)
+    try:
+        if len(operations) == 1:
+            filter, document, array_filters = operations[0]
+            return resolve(collection.update_one(filter, document, array_filters=array_filters)).matched_count
+        return resolve(collection.bulk_write(update.get_operations())).matched_count
+    finally:
+        evict_cache(collection, [update.root_id])
+
+
+def _save_bounded(collection, update, operations):
+    # pushes to bounded arrays (Meta.bounded_arrays) keep the last 'size' elements via $slice, the elements removed by
+    # it (taken from the document before the update, by find_one_and_update) are moved to the bucket collection.
+    # operations are sent in order, returns matched of the last one
+    matched = 0
+    try:
+        for filter, document, array_filters in operations:
+            push = document.get('$push', {})
+            paths = [path for path in push if path in update.bounded]
+            if not paths:
+                matched = resolve(collection.update_one(filter, document, array_filters=array_filters)).matched_count
+                continue
+            push = {path: update.bounded[path].get_push(value) if path in paths else value for path, value in push.items()}
+            before = resolve(collection.find_one_and_update(filter, {**document, '$push': push},
+                                                            {path: 1 for path in paths}, array_filters=array_filters))
+            matched = int(before is not None)
+            if before is not None:
+                for path in paths:
+                    update.bounded[path].save_overflow(update.root_id, before.get(path) or [], push[path]['$each'])
+    finally:
+        evict_cache(collection, [update.root_id])
+    return matched
+
+
+def _bound_created(serializer, documents):
+    # arrays of created documents longer than their bound (Meta.bounded_arrays) keep the last 'size' elements, returns
+    # the removed elements by index of 'documents', moved to buckets by _save_created_overflow() after writing them
+    bounded = getattr(serializer, 'bounded_arrays', None)
+    overflow = {}
+    for index, document in enumerate(documents if bounded else ()):
+        for path, array in bounded.items():
+            if len(document.get(path) or ()) > array.size:
+                document[path], overflow.setdefault(index, {})[path] = array.split(document[path])
+    return overflow
+
+
+def _save_created_overflow(serializer, documents, overflow, failed=()):
+    # 'failed' is indexes of documents not written
+    for index, paths in overflow.items():
+        if index not in failed and documents[index].get('_id') is not None:
+            for path, items in paths.items():
+                serializer.bounded_arrays[path].save_items(documents[index]['_id'], items)
+
+
+def _save_updates(collection, updates, batch_size):
+    # operations of all documents sent by bulk_write(ordered=False), 'batch_size' operations in each one. failure of a
+    # document doesn't stop others, returns result of each document like: [{'_id': .., 'ok': True}, ..]
+    results = [{'_id': update.root_id, 'ok': True} for update in updates]
+    if unit_of_work.get() is not None:    # errors raised by UnitOfWork at the end
+        for update in updates:
+            _save_update(collection, update)
+        return results
+    operations, owners = [], []    # owners[i] is index of the document of operations[i]
+    guarded = {}    # index: update, updates with version sent in the batches
+    for index, update in enumerate(updates):
+        document_operations = update.get_operations()
+        if update.version and len(document_operations) > 1 or update.get_bounded_paths():
+            # order of the operations of bulk_write(ordered=False) is not kept, but only the last one increments the
+            # version, so sent separately (in order). pushes to bounded arrays need the document before the update
+            if not _save_update(collection, update) and update.version:
+                results[index].update(ok=False, errors=[VERSION_CONFLICT_MESSAGE])
+            continue
+        if update.version:
+            guarded[index] = update
+        for operation in document_operations:
+            operations.append(operation)
+            owners.append(index)
+    starts = range(0, len(operations), batch_size)
+    batches = resolve_all([lambda start=start: collection.bulk_write(operations[start:start + batch_size], ordered=False)
+                           for start in starts])
+    evict_cache(collection, [updates[index].root_id for index in sorted(set(owners))])
+    for start, e in zip(starts, batches):
+        if isinstance(e, BulkWriteError):
+            for error in e.details.get('writeErrors', []):
+                result = results[owners[start + error['index']]]
+                result['ok'] = False
+                result.setdefault('errors', []).append(error.get('errmsg'))
+        elif isinstance(e, Exception):
+            raise e
+    if guarded:
+        # matched count of each document is not known in bulk_write, so version of updated documents checked after
+        version_field = next(iter(guarded.values())).version[0]
+        ids = [ObjectId(update.root_id) for update in guarded.values()]
+        versions = {document['_id']: document.get(version_field) for document in
+                    fetch_all(collection.find({'_id': {'$in': ids}}, {version_field: 1}))}
+        for index, update in guarded.items():
+            expected = (update.version[1] or 0) + 1
+            if results[index]['ok'] and versions.get(ObjectId(update.root_id)) != expected:
+                results[index].update(ok=False, errors=[VERSION_CONFLICT_MESSAGE])
+    return results
+
+
+VERSION_CONFLICT_MESSAGE = 'The document is changed or deleted by another request.'
+
+
+def diff_updates(collection, updates, documents=None, version_field=None, auto_paths=()):
+    # diff mode of updating, $set of unchanged values removed from 'updates' (list of MongoUpdate) and with
+    # 'version_field' every update guarded by the version of its document. 'documents' are current documents by _id,
+    # others fetched by one find() only with the paths of updates. if only 'auto_paths' (auto_now fields) are changed,
+    # the document is not updated
+    documents = dict(documents or {})
+    missing = [ObjectId(update.root_id) for update in updates if ObjectId(update.root_id) not in documents]
+    if missing:
+        paths = {path for update in updates for path in update.get_paths()}
+        if version_field:
+            paths.add(version_field)
+        # a path can't be projected with its parent path (like 'author' and 'author.id')
+        projection = {path: 1 for path in paths if not any(path.startswith(f'{other}.') for other in paths)}
+        for document in fetch_all(collection.find({'_id': {'$in': missing}}, projection)):
+            documents[document['_id']] = document
+    for update in updates:
+        document = documents.get(ObjectId(update.root_id))
+        if document is not None:
+            update.diff(document)
+            if all(path in auto_paths for path in update.set) and not (update.push or update.operations):
+                update.set.clear()
+        if version_field and not update.is_empty():
+            # not existed document (deleted) is reported as conflict, nothing matches
+            update.version = (version_field, document.get(version_field) if document is not None else None)
+    return updates
+
+
+class MongoUpdate:
+    # collects $set/$push parts of updating one document (main and nested fields), to save them by one update_one
+    def __init__(self, root_id):
+        self.root_id = root_id
+        self.filter = {}          # additional conditions to {'_id': root_id}
+        self.set = {}
+        self.push = {}
+        self.array_filters = []
+        self.operations = []      # (filter, update) of operations that can't be merged into the update document
+        # like ('version', 3), update only matches the document with this version (optimistic concurrency) and
+        # increments it, set by diff_updates()
+        self.version = None
+        self.bounded = {}         # BoundedArray of the arrays, like {'comments': BoundedArray(..)} (Meta.bounded_arrays)
+
+    def array_element(self, query, _id):
+        # 'comments.$.' -> 'comments.$[a0].' and {'a0._id': _id} added to arrayFilters. query of parents could already
+        # be resolved like: 'comments.$[a0].replies.$.' -> 'comments.$[a0].replies.$[a1].'
+        identifier = f'a{len(self.array_filters)}'
+        self.array_filters.append({f'{identifier}._id': ObjectId(_id)})
+        return f'{query[:-2]}$[{identifier}].'
+
+    def add_set(self, query, data):
+        self.set.update({f'{query}{attr}': value for attr, value in data.items()})
+
+    def add_push(self, query, document):   # all documents pushed to an array, merged via $each
+        self.push.setdefault(query, {'$each': []})['$each'].append(document)
+
+    def get_filter(self):
+        return {'_id': ObjectId(self.root_id), **self.filter, **self.get_version_filter()}
+
+    def get_bounded_paths(self):
+        return [path for path in self.push if path in self.bounded]
+
+    def get_version_filter(self):
+        return {self.version[0]: self.version[1]} if self.version else {}
+
+    def is_empty(self):
+        return not (self.set or self.push or self.operations)
+
+    def get_paths(self):
+        # paths of the document required by .diff(), like: ['title', 'comments._id', 'comments.content']
+        paths = set()
+        for path in self.set:
+            parts = path.split('.')
+            for index, part in enumerate(parts):
+                if part.startswith('$['):    # elements of the array matched by _id
+                    paths.add('.'.join(part for part in parts[:index] if not part.startswith('$')) + '._id')
+            paths.add('.'.join(part for part in parts if not part.startswith('$')))
+        return paths
+
+    def diff(self, document):
+        # removes $set of the values same as 'document' (current document in db), so only changed paths are sent
+        identifiers = {key.split('.')[0]: value for array_filter in self.array_filters for key, value in array_filter.items()}
+        for path, value in list(self.set.items()):
+            current = document
+            for part in path.split('.'):
+                if part.startswith('$[') and isinstance(current, list):   # element of the array by its _id
+                    _id = identifiers.get(part[2:-1])
+                    current = next((item for item in current if isinstance(item, dict) and item.get('_id') == _id), None)
+                elif isinstance(current, dict) and part in current:
+                    current = current[part]
+                else:
+                    break
+            else:
+                if _same_value(current, value):
+                    del self.set[path]
+
+    def get_updates(self):
+        # mongo rejects $push to an array in same update with $set of its elements (like 'comments' and
+        # 'comments.$[a0].content'), so conflicted pushes are separated to the second update document
+        conflicted = {query: value for query, value in self.push.items()
+                      if any(path.startswith(f'{query}.') or path == query for path in self.set)}
+        first, second = {}, {}
+        if self.set:
+            first['$set'] = self.set
+        if len(conflicted) < len(self.push):
+            first['$push'] = {query: value for query, value in self.push.items() if query not in conflicted}
+        if conflicted:
+            second['$push'] = conflicted
+        return [update for update in (first, second) if update]
+
+    def get_array_filters(self, index):
+        # every arrayFilters identifier have to be used in its update document
+        update = self.get_updates()[index]
+        paths = [path for parts in update.values() for path in parts]
+        array_filters = [array_filter for array_filter in self.array_filters
+                         if any(f'$[{next(iter(array_filter)).split(".")[0]}]' in path for path in paths)]
+        return array_filters or None
+
+    def get_operations(self):
+        return [UpdateOne(filter, update, array_filters=array_filters)
+                for filter, update, array_filters in self._get_operations()]
+
+    def _get_operations(self):
+        # (filter, update, array_filters) of all operations, with version all of them match only the current version
+        # and the last one increments it
+        operations = [(self.get_filter(), update, self.get_array_filters(index))
+                      for index, update in enumerate(self.get_updates())]
+        operations += [({**filter, **self.get_version_filter()}, update, None) for filter, update in self.operations]
+        if self.version and operations:
+            filter, update, array_filters = operations[-1]
+            operations[-1] = (filter, {**update, '$inc': {self.version[0]: 1}}, array_filters)
+        return operations
+
+
+call_state = ContextVar('call_state', default=None)    # CallState of the serializer running now (innermost)
+
+
+class CallState:
+    # state of one call of a serializer (validating or updating one document, main or nested): '_id' of the document,
+    # 'root_id' of the main document, 'query' (path in the main document and 'edit', 'add_array' or 'add_dict') and
+    # 'mongo_update' (MongoUpdate of the main document in updating). the parent passes a new one to each nested field
+    # and each item of lists (instead of setting them on the fields), so the same serializer could validate several
+    # items at once (like by threads). while running (with state:), serializer's attributes read from it
+    def __init__(self, serializer, _id=None, root_id=None, query=('', 'edit'), mongo_update=None, parent=None,
+                 pending_updates=None):
+        self.serializer = serializer
+        self._id = _id
+        self.root_id = root_id
+        self.query = tuple(query)
+        self.mongo_update = mongo_update
+        self.parent = parent      # CallState of the parent serializer
+        self.pending_updates = pending_updates    # if list, mongo_update is added to it (saved by the list in bulk)
+        self._tokens = []
+
+    def nested(self, serializer, _id=None, query=None):   # state of a nested field (or an item) in the same document
+        return CallState(serializer, _id, self.root_id, query or self.query, self.mongo_update, self)
+
+    def __enter__(self):
+        self._tokens.append(call_state.set(self))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        call_state.reset(self._tokens.pop())
+        return False
+
+
+def get_call_state(serializer):   # CallState of 'serializer' if it (or one of its nested fields) is running, or None
+    state = call_state.get()
+    while state is not None and state.serializer is not serializer:
+        state = state.parent
+    return state
+
+
+class CallAttribute:
+    # attribute of serializers (like _id), read from CallState of the serializer while it's running, otherwise the
+    # value given to the serializer (like serializer(_id=..)). so validators and fields read it just like before
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, serializer, owner=None):
+        if serializer is None:
+            return self
+        state = get_call_state(serializer)
+        return getattr(state, self.name) if state is not None else serializer.__dict__.get(self.name)
+
+    def __set__(self, serializer, value):
+        serializer.__dict__[self.name] = value
+
+
+document_caches = {}    # caches of the collections by full_name of the collection, set by set_document_cache()
+
+
+unit_of_work = ContextVar('unit_of_work', default=None)    # current UnitOfWork
+
+
+def _same_value(current, value):
+    # value in db same as value to set. mappings (like OrderedDict of django fields vs dict of db) and arrays compared
+    # by their items (keys in same order, like bson), other values by their type too (1 vs 1.0 vs True are saved
+    # different)
+    if isinstance(current, Mapping) and isinstance(value, Mapping):
+        return list(current) == list(value) and all(_same_value(current[key], value[key]) for key in current)
+    if isinstance(current, (list, tuple)) and isinstance(value, (list, tuple)):
+        return len(current) == len(value) and all(map(_same_value, current, value))
+    return type(current) == type(value) and current == value
+
+
+class UnitOfWork:
+    # collects all writes of save_to_mongo (several serializers, main and nested fields) inside 'with UnitOfWork():'
+    # and saves them at the end by one bulk_write per collection (in order). transaction=True saves all of them in a
+    # transaction (needs replica set), or pass 'session' of your own. if the block raises, nothing is saved
+    def __init__(self, session=None, transaction=False):
+        self.session = session
+        self.transaction = transaction
+        self.operations = {}    # full_name: (collection, [operations])
+        self.guarded = []       # (collection, MongoUpdate) of updates with version, checked after writing
+        self.evictions = []     # (collection, ids) of document caches, evicted after writing
+        self.results = {}       # full_name: BulkWriteResult, after flush
+        self._tokens = []
+
+    def add(self, collection, operations, update=None):
+        self.operations.setdefault(collection.full_name, (collection, []))[1].extend(operations)
+        if update is not None and update.version:
+            self.guarded.append((collection, update))
+
+    def pending_operations(self):     # like: {'db.blog': [InsertOne(...), UpdateOne(...)]}, useful in tests
+        return {name: list(operations) for name, (collection, operations) in self.operations.items()}
+
+    def flush(self):
+        operations, guarded, evictions = self.operations, self.guarded, self.evictions
+        self.operations, self.guarded, self.evictions = {}, [], []
+        token = unit_of_work.set(None)    # flush could be called inside the block too
+        try:
+            if self.transaction and operations:
+                if in_async():
+                    raise RuntimeError("transaction=True is not supported in async, pass 'session' instead")
+                client = next(iter(operations.values()))[0].database.client
+                with client.start_session() as session:
+                    with session.start_transaction():   # aborted if raises (like version conflict)
+                        self.results = self._write(operations, guarded, session)
+            else:
+                self.results = self._write(operations, guarded, self.session)
+        finally:
+            for collection, ids in evictions:
+                evict_cache(collection, ids)
+            unit_of_work.reset(token)
+        return self.results
+
+    def _write(self, operations, guarded, session):
+        results = {}
+        for name, (collection, collection_operations) in operations.items():
+            results[name] = resolve(collection.bulk_write(collection_operations, session=session))
+        conflicts = {}
+        for collection, update in guarded:
+            # matched count of each operation is not known in bulk_write, so versions checked after it
+            field, expected = update.version
+            document = resolve(collection.find_one({'_id': ObjectId(update.root_id)}, {field: 1}, session=session))
+            if document is None or document.get(field) != (expected or 0) + 1:
+                conflicts[field] = [VERSION_CONFLICT_MESSAGE]
+        if conflicts:
+            raise serializers.ValidationError(conflicts)
+        return results
 
+    def __enter__(self):
+        self._tokens.append(unit_of_work.set(self))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        unit_of_work.reset(self._tokens.pop())
+        if exc_type is None:
+            self.flush()
+        return False
+
+    async def __aenter__(self):     # async with UnitOfWork(): ... (for async collections)
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        unit_of_work.reset(self._tokens.pop())
+        if exc_type is None:
+            await run_async(self.flush)
+        return False
+
+
+class WriteBehindBuffer:
+    # updates of serializers with Meta.write_behind are merged by _id in memory and saved by a background thread, one
+    # bulk_write for every 'max_documents' documents or every 'interval' seconds (and at exit of the process). values of
+    # Meta.write_behind_fields are merged by their operator like: {'views': '$inc', 'last_seen': '$max'}, others by $set
+    # (last one). saves wait (backpressure) while 'max_pending' documents are not saved yet
+    operators = ('$set', '$inc', '$max')
+
+    def __init__(self, max_documents=1000, interval=1.0, max_pending=10000):
+        self.max_documents = max_documents
+        self.interval = interval
+        self.max_pending = max_pending
+        self.pending = OrderedDict()     # (collection name, _id): (collection, {'$set': {..}, '$inc': {..}, ..})
+        self.flushing = set()            # keys of 'pending' being saved by the running flush
+        self.condition = threading.Condition()
+        self.flush_lock = threading.Lock()    # flushes run one by one, in order
+        self.thread = None
+        self.closed = False
+        self.stats = {'updates': 0, 'flushes': 0, 'documents': 0, 'failed': 0}
+
+    def add(self, collection, update, fields=None):
+        # merges MongoUpdate of a document, returns False if it can't be merged (like nested arrays, $push), that
+        # should be saved directly (pending updates of the document are saved before it)
+        key = (collection.full_name, ObjectId(update.root_id))
+        if update.push or update.operations or update.array_filters or update.filter or update.version or self.closed:
+            with self.condition:
+                waiting = key in self.pending or key in self.flushing
+            if waiting:    # returns after the running flush too (flushes are serialized), so writes stay in order
+                self.flush()
+            return False
+        if not update.set:     # nothing to save (like a save without changes in diff mode)
+            return True
+        fields = fields or {}
+        with self.condition:
+            while len(self.pending) >= self.max_pending and key not in self.pending:
+                self.condition.notify_all()
+                self.condition.wait()
+            document = self.pending.setdefault(key, (collection, {operator: {} for operator in self.operators}))[1]
+            for path, value in update.set.items():
+                operator = fields.get(path, '$set')
+                values = document[operator]
+                if operator == '$inc' and path in values:
+                    values[path] += value
+                elif operator == '$max' and path in values:
+                    values[path] = max(values[path], value)
+                else:
+                    values[path] = value
+            self.stats['updates'] += 1
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='mongoserializer-write-behind', daemon=True)
+                self.thread.start()
+                atexit.register(self.close)
+            if self._is_full():
+                self.condition.notify_all()
+        return True
+
+    def _is_full(self):    # flushed without waiting for 'interval'
+        return len(self.pending) >= min(self.max_documents, self.max_pending)
+
+    def flush(self):
+        with self.flush_lock:
+            with self.condition:
+                pending, self.pending = self.pending, OrderedDict()
+                self.flushing = set(pending)
+                self.condition.notify_all()     # waiting saves (backpressure) continue
+            try:
+                self._write(pending)
+            finally:
+                with self.condition:
+                    self.flushing = set()
+
+    def _write(self, pending):
+        operations = {}
+        for (name, _id), (collection, document) in pending.items():
+            update = {operator: values for operator, values in document.items() if values}
+            if update:      # empty update is rejected by mongo, and fails the bulk_write of whole collection
+                operations.setdefault(name, (collection, []))[1].append(UpdateOne({'_id': _id}, update))
+        for name, (collection, collection_operations) in operations.items():
+            try:
+                collection.bulk_write(collection_operations, ordered=False)
+            except Exception:
+                self.stats['failed'] += len(collection_operations)
+                logger.exception('write-behind flush of %s failed', name)
+            evict_cache(collection, [operation._filter['_id'] for operation in collection_operations])
+        if pending:
+            self.stats['flushes'] += 1
+            self.stats['documents'] += len(pending)
+
+    def _run(self):
+        while True:
+            with self.condition:
+                if not self.closed and not self._is_full():
+                    self.condition.wait(self.interval)
+                closed = self.closed
+            self.flush()
+            if closed:
+                return
+
+    def close(self):    # saves pending updates and stops the thread, called at exit of the process too
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        self.flush()
+
+
+class BoundedArray:
+    """
+    keeps only the last 'size' elements of an array field of the documents (like blog.comments), set in the main
+    serializer like: Meta.bounded_arrays = {'comments': BoundedArray(50, bucket=db.blog_comments)}. documents added to
+    it are pushed via $each with $slice (and $sort if 'sort', like {'published_date': 1}), elements removed by $slice
+    are moved to 'bucket' collection (dropped if bucket=None), about 'bucket_size' elements (less than twice of it)
+    in each bucket document like: {'_id': .., 'root_id': blog_id, 'count': 100, 'items': [...]}. elements are read
+    through the array and its buckets via MongoSerializer.find_array_page()
+    """
+
+    def __init__(self, size, bucket=None, sort=None, bucket_size=100):
+        self.size = size
+        self.bucket = bucket
+        # _id breaks ties, so elements removed by mongo are same as .get_overflow()
+        self.sort = {**sort, '_id': sort.get('_id', 1)} if sort else None
+        self.bucket_size = bucket_size
+
+    def get_push(self, push):    # {'$each': [..]} -> {'$each': [..], '$sort': {..}, '$slice': -size}
+        push = dict(push)
+        if self.sort:
+            push['$sort'] = self.sort
+        push['$slice'] = -self.size
+        return push
+
+    def split(self, elements):
+        # (kept, removed) elements of the array, same as $sort and $slice of mongo
+        elements = list(elements)
+        if self.sort:
+            for key, direction in reversed(list(self.sort.items())):   # stable sorts, last key first
+                # not existed value sorts first, like mongo (null)
+                elements.sort(key=lambda element: (element.get(key) is not None, element.get(key)),
+                              reverse=direction < 0)
+        index = max(len(elements) - self.size, 0)
+        return elements[index:], elements[:index]
+
+    def get_overflow(self, current, pushed):
+        # elements removed by $slice, 'current' is the array before the push
+        return self.split(list(current) + list(pushed))[1]
+
+    def save_overflow(self, root_id, current, pushed):
+        self.save_items(root_id, self.get_overflow(current, pushed))
+
+    def save_items(self, root_id, items):
+        # moves removed elements of document 'root_id' to the bucket (deferred inside UnitOfWork)
+        if not items or self.bucket is None:
+            return
+        # appended to the last not full bucket of the document (only the last one could be), or creates the next one
+        chunks = [items[start:start + self.bucket_size] for start in range(0, len(items), self.bucket_size)]
+        operations = [({'root_id': ObjectId(root_id), 'count': {'$lt': self.bucket_size}},
+                       {'$push': {'items': {'$each': chunk}}, '$inc': {'count': len(chunk)}}) for chunk in chunks]
+        work = unit_of_work.get()
+        if work is not None:
+            work.add(self.bucket, [UpdateOne(*operation, upsert=True) for operation in operations])
+            return
+        for operation in operations:    # in order, each one fills the bucket the next one checks
+            resolve(self.bucket.update_one(*operation, upsert=True))
+
+    def read(self, collection, path, root_id, after=None, limit=20):
+        # elements of the array newest first (last of the array first, then buckets newest first) after element
+        # 'after' (_id of it). returns (elements, _id of last element or None if there is no next page)
+        root_id = ObjectId(root_id)
+        document = resolve(collection.find_one({'_id': root_id}, {path: 1})) or {}
+        elements = list(reversed(document.get(path) or []))
+        buckets = {'root_id': root_id}
+        if after is not None:
+            index = next((i for i, element in enumerate(elements) if element.get('_id') == after), None)
+            if index is not None:
+                elements = elements[index + 1:]
+            else:   # moved to a bucket after reading the previous page
+                bucket = resolve(self.bucket.find_one({'root_id': root_id, 'items._id': after})) \
+                    if self.bucket is not None else None
+                if bucket is None:
+                    return [], None
+                elements = list(reversed(bucket['items']))
+                index = next(i for i, element in enumerate(elements) if element.get('_id') == after)
+                elements = elements[index + 1:]
+                buckets['_id'] = {'$lt': bucket['_id']}
+        while len(elements) <= limit and self.bucket is not None:    # one more element, to know there is a next page
+            count = (limit - len(elements)) // self.bucket_size + 1
+            documents = fetch_all(self.bucket.find(buckets).sort('_id', -1).limit(count))
+            for bucket in documents:
+                elements.extend(reversed(bucket['items']))
+            if len(documents) < count:
+                break
+            buckets['_id'] = {'$lt': documents[-1]['_id']}
+        if len(elements) > limit:
+            return elements[:limit], elements[limit - 1]['_id']
+        return elements, None
+
+
+def set_document_cache(collection, cache):
+    # documents of 'collection' read by MongoSerializer.find_one() are cached in 'cache' (LRUCache, DjangoCache), all
+    # writes of the library to the collection evict them. cache=None disables it
+    if cache is None:
+        document_caches.pop(collection.full_name, None)
+    else:
+        document_caches[collection.full_name] = cache
+
+
+def evict_cache(collection, ids=None):
+    # evicts cached documents of 'ids' after writing them, ids=None evicts all documents of the collection (like
+    # upsert by natural key, _id of updated documents is not known)
+    cache = document_caches.get(getattr(collection, 'full_name', None))
+    work = unit_of_work.get()
+    if cache is not None and work is not None:    # evicted after writing them
+        work.evictions.append((collection, ids))
+    elif cache is not None:
+        if ids is None:
+            cache.evict_collection(collection)
+        else:
+            cache.evict(collection, [ObjectId(_id) for _id in ids if _id])
+
+
+class DocumentCache:
+    # base of the caches of documents by _id, value of each _id is like: {projection: document}, so a write evicts all
+    # projections of the document together. version() is taken before reading the document from db, set() with it
+    # skips saving if the document is evicted (written) in the meantime, so a stale document is not cached
+    def __init__(self):
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, collection, _id, projection):
+        entry = self._get(collection, _id)
+        document = entry.get(projection) if entry else None
+        self.stats['hits' if document is not None else 'misses'] += 1
+        return document
+
+    def set(self, collection, _id, projection, document, version=None):
+        entry = self._get(collection, _id) or {}
+        self._set(collection, _id, {**entry, projection: document}, version)
+
+
+class LRUCache(DocumentCache):
+    # in process cache, keeps 'max_size' documents (least recently used removed), each one for 'ttl' seconds
+    def __init__(self, max_size=1000, ttl=60):
+        super().__init__()
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()    # (collection name, _id): (expire time, entry)
+        # clock of the last eviction of each key ((collection name, None) for whole collection), last 'max_size' ones
+        self.evicted = OrderedDict()
+        self.clock = 0
+        self.pruned = 0     # clock of the last removed one of 'evicted', older versions are treated as evicted
+        self.lock = threading.Lock()
+
+    def version(self, collection, _id):
+        with self.lock:
+            return self.clock
+
+    def _evicted(self, key):     # with self.lock
+        self.clock += 1
+        self.evicted[key] = self.clock
+        self.evicted.move_to_end(key)
+        while len(self.evicted) > self.max_size:
+            self.pruned = self.evicted.popitem(last=False)[1]
+
+    def _get(self, collection, _id):
+        key = (collection.full_name, _id)
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                return None
+            if item[0] < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return item[1]
+
+    def _set(self, collection, _id, entry, version=None):
+        key = (collection.full_name, _id)
+        with self.lock:
+            if version is not None and (version < self.pruned or self.evicted.get(key, 0) > version or
+                                        self.evicted.get((collection.full_name, None), 0) > version):
+                return
+            self.entries[key] = (time.monotonic() + self.ttl, entry)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def evict(self, collection, ids):
+        with self.lock:
+            for _id in ids:
+                self._evicted((collection.full_name, _id))
+                if self.entries.pop((collection.full_name, _id), None) is not None:
+                    self.stats['evictions'] += 1
+
+    def evict_collection(self, collection):
+        with self.lock:
+            self._evicted((collection.full_name, None))
+            keys = [key for key in self.entries if key[0] == collection.full_name]
+            for key in keys:
+                del self.entries[key]
+            self.stats['evictions'] += len(keys)
+
+
+class DjangoCache(DocumentCache):
+    # cache by django's cache framework (CACHES setting), shared by processes (like redis or memcached backend).
+    # keys of a collection include a generation token, evicting whole collection only replaces the token. version of
+    # a document is a token replaced by every eviction of it (kept 'timeout' seconds)
+    def __init__(self, alias='default', timeout=60, prefix='mongoserializer'):
+        super().__init__()
+        self.cache = caches[alias]
+        self.timeout = timeout
+        self.prefix = prefix
+
+    def _key(self, collection, _id):
+        generation_key = f'{self.prefix}:{collection.full_name}'
+        generation = self.cache.get(generation_key)
+        if generation is None:    # new token if it's removed by the cache backend, so older keys never used again
+            self.cache.add(generation_key, uuid.uuid4().hex, None)
+            generation = self.cache.get(generation_key)
+        return f'{generation_key}:{generation}:{_id}'
+
+    def _get(self, collection, _id):
+        return self.cache.get(self._key(collection, _id))
+
+    def version(self, collection, _id):
+        key = self._key(collection, _id)    # generation of the collection included
+        return key, self.cache.get(f'{key}:version')
+
+    def _set(self, collection, _id, entry, version=None):
+        key = self._key(collection, _id)
+        if version is not None and (key, self.cache.get(f'{key}:version')) != version:
+            return
+        self.cache.set(key, entry, self.timeout)
+        # checked again, an eviction by other process between the check and the set is seen here (it replaces the
+        # version before deleting the document)
+        if version is not None and self.cache.get(f'{key}:version') != version[1]:
+            self.cache.delete(key)
+
+    def evict(self, collection, ids):
+        for _id in ids:
+            key = self._key(collection, _id)
+            self.cache.set(f'{key}:version', uuid.uuid4().hex, self.timeout)
+            if self.cache.delete(key):
+                self.stats['evictions'] += 1
+
+    def evict_collection(self, collection):
+        self.cache.set(f'{self.prefix}:{collection.full_name}', uuid.uuid4().hex, None)
+        self.stats['evictions'] += 1
+
+
+def read_documents(data):
+    # 'data' is a file (NDJSON, a json document per line) or any iterable of dicts/json strings, read lazily.
+    # yields (index, document, error), index is line number (starts from 0), error is message of invalid json line or
+    # not object value (like 42 or [..]). str or bytes 'data' is the content of NDJSON (split to lines)
+    if isinstance(data, (str, bytes)):
+        data = data.splitlines()
+    for index, item in enumerate(data):
+        error = None
+        if isinstance(item, (str, bytes)):
+            if not item.strip():      # blank lines of the file
+                continue
+            try:
+                item = json.loads(item)
+            except ValueError as e:
+                item, error = None, f'Invalid JSON: {e}'
+        if error is None and not isinstance(item, dict):
+            item, error = None, 'Expected a JSON object.'
+        yield index, item, error
+
+
+# convert dict to object like: DictToObject({'spec': {'age': 22}}).spec.age==22, can also use list
 class CallBack:
-    # sub_counter counts calls of CallBack like: CallBack(data) sub_counter==1 for use in __repr__
-    def __init__(self, data, sub_counter=None):
-        self.data = data
-        self.sub_counter = 1 if not sub_counter else sub_counter
+    # wraps 'data' (dict, or list/cursor of dicts) to access its keys as attribute like obj.title, nested dicts and lists
+    # are wrapped only when accessed (not whole of data in creation). keys like '240' accessed by obj['240'].
+    # sub_counter counts level of CallBack like: CallBack(data) sub_counter==1 for use in __repr__
+    __slots__ = ('_data', '_sub_counter', '_values', '_all_fields')
+
+    def __init__(self, data, sub_counter=None, all_fields=None):
+        self._data = data
+        self._sub_counter = 1 if not sub_counter else sub_counter
+        self._values = None         # wrapped values of accessed keys, and attributes set on the object
+        self._all_fields = all_fields   # fields not in 'data' returned as None
+
+    def __getattr__(self, name):    # called only when 'name' is not set in the object
+        if name in CallBack.__slots__:
+            raise AttributeError(name)
+        values = self._values
+        if values is not None and name in values:
+            return values[name]
+        data = self._data
         if isinstance(data, dict):
-            self.items = {}
-            for key, value in data.items():
-                # for keys like '240' now we can: obj['240'] and even obj['240'].image, instead obj.240 (error)
-                if isinstance(key, int) or isinstance(key, str) and key.isdigit():
-                    self.items[key] = self._convert(value)
-                else:
-                    setattr(self, key, self._convert(value))
-        # manage list and MongoDB cursor (doc.find(....))
-        elif isinstance(data, Iterable) and not isinstance(data, (str, bytes)):
-            self.items = [self._convert(item) for item in data]
+            if name in data:
+                return self._get(name)
+            elif self._all_fields and name in self._all_fields:
+                return None
+        if name == 'data':             # keys of data with these names have priority
+            return data
+        elif name == 'sub_counter':
+            return self._sub_counter
+        elif name == 'items':
+            if isinstance(data, dict):
+                return {key: self[key] for key in self}
+            return [self[index] for index in range(len(self._materialize()))]
+        raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{name}'")
+
+    def __setattr__(self, name, value):
+        if name in CallBack.__slots__:
+            object.__setattr__(self, name, value)
+        else:
+            if self._values is None:
+                self._values = {}
+            self._values[name] = value
 
-    def _convert(self, value):
+    def _get(self, key):
+        # value of key (or index) of data, dicts and lists are wrapped once and kept (so obj.a is obj.a)
+        value = self._data[key]
+        if isinstance(value, (dict, list)):
+            value = self._wrap(value, self._all_fields if not isinstance(self._data, dict) else None)
+            if self._values is None:
+                self._values = {}
+            self._values[key] = value
+        return value
+
+    def _wrap(self, value, all_fields=None):
         if isinstance(value, dict):
-            return self.__class__(value, self.sub_counter + 1)
-        elif isinstance(value, list):
-            return [self._convert(item) for item in value]
+            cls = CallBack if isinstance(self, DictToObject) else self.__class__
+            return cls(value, self._sub_counter + 1, all_fields)
+        elif isinstance(value, list):     # items of the list wrapped lazily too
+            return [self._wrap(item) for item in value]
         else:
             return value
 
+    def _materialize(self):     # cursor (or other iterables) converted to list only if index is required
+        if not isinstance(self._data, (dict, list)):
+            self._data = list(self._data)
+        return self._data
+
     def __getitem__(self, key):
-        if hasattr(self, "items"):
-            return self.items[key]
-        else:
-            raise TypeError("Index access is not supported on this object")
+        if isinstance(self._data, dict):
+            values = self._values
+            return values[key] if values is not None and key in values else self._get(key)
+        self._materialize()
+        if isinstance(key, slice):
+            return [self[index] for index in range(len(self._data))[key]]
+        values = self._values
+        return values[key] if values is not None and key in values else self._get(key)
 
     def __iter__(self):
-        if self.items:
-            return iter(self.items)
+        data = self._data
+        if isinstance(data, dict):    # keys like '240'
+            return (key for key in data if isinstance(key, int) or isinstance(key, str) and key.isdigit())
+        values = self._values or {}
+        if isinstance(data, list):   # items got by index before (could have attributes set) are used
+            return (values[index] if index in values else self._wrap(item, self._all_fields)
+                    for index, item in enumerate(data))
+        # cursor is iterated one by one (like the cursor itself, only once), without keeping the items
+        return (self._wrap(item, self._all_fields) for item in data)
 
     def __repr__(self):
-        if self.sub_counter == 1:
-            return f'Class {self.__class__.__name__}: ' + repr(self.data)
-        return repr(self.data)
+        if self._sub_counter == 1:
+            return f'Class {self.__class__.__name__}: ' + repr(self._data)
+        return repr(self._data)
+
+
+class DictToObject(CallBack):
+    # 'data' can be dict or list of dicts (pass many=True)
+    # if a serializer fields are 'a', 'b' and only 'a' provided in data, all_fields make b=None to prevent error
+    __slots__ = ()
+
+    def __init__(self, data, many=None, all_fields=None):
+        if isinstance(data, dict):   # data is dict
+            pass
+        # manage list and MongoDB cursor (col.find(....))
+        elif isinstance(data, Iterable) and not isinstance(data, (str, bytes)):
+            if not many:
+                raise ValueError("class DictToObject: Iterable data type, pass 'many=True' to fix")
+        else:
+            raise ValueError("Unsupported data type for conversion: must be dict or list of dicts")
+        if all_fields:
+            # {'_id': None} will cause saving _id=None is db (in PostMongoSerializer)
+            all_fields = frozenset(field for field in all_fields if field != '_id')
+        super().__init__(data, all_fields=all_fields or None)
 
 
 class MongoUniqueValidator(UniqueValidator):
@@ -223,27 +1256,201 @@ class MongoUniqueValidator(UniqueValidator):
         self.collection = collection
         self.field = field
         self.message = message or f'The {field} must be unique.'
+        self.key = (collection.full_name, field)   # key of prefetched values in serializer's context
 
     def __call__(self, value, serializer_field):
-        self._id = getattr(serializer_field.parent, '_id', None)
-        query = {self.field: value}
-        if self._id:
-            # in updating, search all collections (for validating unique) except current collection
-            query['_id'] = {'$ne': ObjectId(self._id)}
-        if self.collection.find_one(query):
+        _id = getattr(serializer_field.parent, '_id', None)
+        if not _id and self.field in (getattr(serializer_field.parent, 'natural_key', None) or ()):
+            return   # in creation, document with same natural key (Meta.natural_key) is updated instead (upsert)
+        prefetched = serializer_field.context.get('unique_values', {}).get(self.key, {})
+        try:
+            ids = prefetched.get(value)
+        except TypeError:     # unhashable value
+            ids = None
+        if ids is not None:   # checked by .prefetch() (many=True), in updating current document is not duplicate
+            exists = any(id != ObjectId(_id) for id in ids) if _id else bool(ids)
+        else:
+            query = {self.field: value}
+            if _id:
+                # in updating, search all collections (for validating unique) except current collection
+                query['_id'] = {'$ne': ObjectId(_id)}
+            exists = resolve(self.collection.find_one(query))
+        if exists:
             raise serializers.ValidationError(self.message)
 
+    def prefetch(self, values, batch_size=1000):
+        # check all 'values' by one $in query per 'batch_size' values (instead one query per value), returns _ids of the
+        # documents having each value like: {'title1': {ObjectId('...')}, 'title2': set()}
+        prefetched = {value: set() for value in values}
+        values = list(prefetched)
+        queries = [{self.field: {'$in': values[start:start + batch_size]}} for start in range(0, len(values), batch_size)]
+        # batches fetched together (concurrently for async collection)
+        for documents in resolve_all([lambda query=query: fetch_all(self.collection.find(query, {self.field: 1}))
+                                      for query in queries]):
+            if isinstance(documents, Exception):
+                raise documents
+            for document in documents:
+                if document.get(self.field) in prefetched:
+                    prefetched[document[self.field]].add(document['_id'])
+        return prefetched
+
 
-class ObjectIdJSONEncoder(json.JSONEncoder):
+class ObjectIdJSONEncoder(encoders.JSONEncoder):
+    # encodes mongo values in addition to DRF's ones (datetime, Decimal, UUID...), bytes and Binary as base64 str
     def default(self, obj):
         if isinstance(obj, ObjectId):
             return str(obj)
+        elif jdatetime and isinstance(obj, (jdatetime.datetime, jdatetime.date)):
+            return obj.isoformat()
+        elif isinstance(obj, Decimal128):
+            return super().default(obj.to_decimal())
+        elif isinstance(obj, CompressedBinary):    # saved value of CompressedField
+            return obj.value
+        elif isinstance(obj, bytes):      # Binary is subclass of bytes
+            return base64.b64encode(obj).decode()
         return super().default(obj)
 
 
+class MongoJSONRenderer(JSONRenderer):   # could be used in DEFAULT_RENDERER_CLASSES instead of JSONRenderer
+    encoder_class = ObjectIdJSONEncoder
+
+
 class ResponseMongo(Response):    # ResponseMongo(data), convert all nested ObjectId('...') of 'data' to serialized str
     def __init__(self, data=None, status=None, template_name=None, headers=None, content_type=None):
-        if data is not None:
-            # Convert the data to JSON using the custom encoder
-            data = json.loads(json.dumps(data, cls=ObjectIdJSONEncoder))
+        # data is encoded in rendering (one pass to bytes), so ResponseMongo(data).data is same as 'data'
         super().__init__(data=data, status=status, template_name=template_name, headers=headers, content_type=content_type)
+
+    @property
+    def rendered_content(self):
+        renderer = getattr(self, 'accepted_renderer', None)
+        if isinstance(renderer, JSONRenderer) and renderer.encoder_class is encoders.JSONEncoder:
+            renderer.encoder_class = ObjectIdJSONEncoder    # renderers are created for every request
+        elif renderer is not None and self.data is not None and not (
+                isinstance(renderer, JSONRenderer) and issubclass(renderer.encoder_class, ObjectIdJSONEncoder)):
+            # other renderers (like BrowsableAPIRenderer) or custom encoders get data with mongo values converted
+            self.data = json.loads(json.dumps(self.data, cls=ObjectIdJSONEncoder))
+        return super().rendered_content
+
+
+class StreamingResponseMongo(StreamingHttpResponse):
+    # StreamingResponseMongo(blog_col.find(), BlogListSerializer), streams documents of 'cursor' (pymongo cursor or
+    # any iterable of dicts) as json array (or ndjson if format='ndjson'), each document serialized by
+    # serializer_class.to_representation (if provided) and encoded by ObjectIdJSONEncoder just before sending it, so
+    # memory and time to first byte don't depend on count of the documents. 'batch_size' is count of the documents
+    # fetched from db in every round trip of the cursor
+    chunk_size = 64 * 1024   # bytes are collected to this size before sending
+
+    def __init__(self, cursor, serializer_class=None, format='json', batch_size=None, request=None, status=None,
+                 headers=None):
+        if format not in ('json', 'ndjson'):
+            raise ValueError(f"format should be 'json' or 'ndjson', but provided: {format}")
+        if batch_size and hasattr(cursor, 'batch_size'):
+            cursor = cursor.batch_size(batch_size)
+        serializer = serializer_class(**({'request': request} if request else {})) if serializer_class else None
+        content_type = 'application/x-ndjson' if format == 'ndjson' else 'application/json'
+        super().__init__(self.stream(cursor, serializer, format), status=status, content_type=content_type,
+                         headers=headers)
+
+    def stream(self, cursor, serializer, format):
+        encode = ObjectIdJSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+        ndjson = format == 'ndjson'
+        chunk, size = [] if ndjson else ['['], 0
+        try:
+            for index, document in enumerate(cursor):
+                if serializer is not None:   # fields are bound once, and used for all documents
+                    document = serializer.to_representation(document)
+                item = encode(document) + '\n' if ndjson else (',' if index else '') + encode(document)
+                chunk.append(item)
+                size += len(item)
+                if size >= self.chunk_size:
+                    yield ''.join(chunk).encode()
+                    chunk, size = [], 0
+            if not ndjson:
+                chunk.append(']')
+            if chunk:
+                yield ''.join(chunk).encode()
+        finally:    # client disconnected or all sent
+            if hasattr(cursor, 'close'):
+                cursor.close()
+
+
+_INT32 = struct.Struct('<i')
+# size of the values with fixed size by bson type: double, undefined, ObjectId, bool, datetime, null, int32, timestamp,
+# int64, decimal128, minkey, maxkey
+_FIXED_SIZES = {1: 8, 6: 0, 7: 12, 8: 1, 9: 8, 10: 0, 16: 4, 17: 8, 18: 8, 19: 16, 255: 0, 127: 0}
+
+
+def get_bson_offsets(raw):
+    # start and end of the top level elements of a bson document, like: {'title': (4, 21), 'comments': (21, 5120)}
+    # only the headers are read (values are skipped by their size), so doesn't decode anything
+    offsets, position, end = {}, 4, len(raw) - 1
+    while position < end:
+        bson_type = raw[position]
+        name_end = raw.index(b'\x00', position + 1)
+        start = name_end + 1      # start of the value
+        if bson_type in _FIXED_SIZES:
+            size = _FIXED_SIZES[bson_type]
+        elif bson_type in (2, 13, 14):    # string, javascript, symbol
+            size = 4 + _INT32.unpack_from(raw, start)[0]
+        elif bson_type in (3, 4, 15):     # document, array, javascript with scope (size includes itself)
+            size = _INT32.unpack_from(raw, start)[0]
+        elif bson_type == 5:              # binary (size, subtype, bytes)
+            size = 5 + _INT32.unpack_from(raw, start)[0]
+        elif bson_type == 11:             # regex (pattern and options as cstring)
+            size = raw.index(b'\x00', raw.index(b'\x00', start) + 1) + 1 - start
+        elif bson_type == 12:             # dbpointer (string and ObjectId)
+            size = 4 + _INT32.unpack_from(raw, start)[0] + 12
+        else:
+            raise InvalidBSON(f'unknown bson type {bson_type} of field {raw[position + 1:name_end]}')
+        offsets[raw[position + 1:name_end].decode()] = (position, start + size)
+        position = start + size
+    return offsets
+
+
+class LazyBSONDocument(RawBSONDocument):
+    # RawBSONDocument which decodes only the fields accessed (each field separately, when accessed first time), used
+    # in read phase like: collection.with_options(codec_options=collection.codec_options.with_options(
+    # document_class=LazyBSONDocument)).find(). RawBSONDocument decodes all top level fields in first access
+    __slots__ = ('_offsets', '_values', '_decode_options')
+    _options_cache = (None, None)   # codec_options of last cursor and its decode options (same for all its documents)
+
+    def __init__(self, bson_bytes, codec_options=None):
+        if isinstance(bson_bytes, memoryview):    # like in bson.decode_all(), offsets are found via bytes.index
+            bson_bytes = bson_bytes.tobytes()
+        super().__init__(bson_bytes, codec_options)
+        self._offsets = self._values = None
+        # values are decoded to python types (dict for nested documents)
+        cached_options, decode_options = LazyBSONDocument._options_cache
+        if codec_options is not cached_options or decode_options is None:
+            decode_options = (codec_options or bson.DEFAULT_CODEC_OPTIONS).with_options(document_class=dict)
+            LazyBSONDocument._options_cache = (codec_options, decode_options)
+        self._decode_options = decode_options
+
+    def __getitem__(self, item):
+        if self._offsets is None:
+            self._offsets, self._values = get_bson_offsets(self.raw), {}
+        try:
+            return self._values[item]
+        except KeyError:
+            start, end = self._offsets[item]    # raises KeyError if field not in the document
+        # element is decoded alone, as a document with one element
+        element = self.raw[start:end]
+        value = bson.decode(_INT32.pack(len(element) + 5) + element + b'\x00', self._decode_options)[item]
+        self._values[item] = value
+        return value
+
+    def __iter__(self):
+        if self._offsets is None:
+            self._offsets, self._values = get_bson_offsets(self.raw), {}
+        return iter(self._offsets)
+
+    def __len__(self):
+        return len(self._offsets if self._offsets is not None else get_bson_offsets(self.raw))
+
+    def __contains__(self, item):
+        if self._offsets is None:
+            self._offsets, self._values = get_bson_offsets(self.raw), {}
+        return item in self._offsets
+
+    def items(self):
+        return ((key, self[key]) for key in self)
@@ -1,32 +1,323 @@
 import rest_framework.fields
 from django.core.exceptions import ValidationError as DjangoValidationError
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models.signals import post_save
 
 from rest_framework import serializers
 from rest_framework.fields import empty
 from rest_framework.exceptions import ValidationError
 from rest_framework.fields import get_error_detail, SkipField
+from rest_framework.settings import api_settings
 
 from collections import OrderedDict
-from copy import deepcopy
-
-from .methods import save_to_mongo
+from collections.abc import Mapping
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import base64
+import binascii
+import bson
+from bson import ObjectId
+from bson.errors import BSONError
+
+from .methods import save_to_mongo, read_documents, MongoUpdate, MongoUniqueValidator, LazyBSONDocument, run_async, \
+    resolve, resolve_all, resolve_sync, fetch_all, in_async, diff_updates, document_caches, evict_cache, CallState, \
+    CallAttribute, get_call_state
 from .fields import IdMongoField
 
 
-def to_internal_value_model(self, data):  # for ModelSerializer, fill self .validated_data
-    return get_object_or_404(self.Meta.model, id=data)
+logger = logging.getLogger(__name__)
 
 
-def to_internal_value_model_many(self, data):  # for ModelSerializer when many=True
-    return self.child.Meta.model.objects.filter(id__in=data)
-
+def to_internal_value_model(self, data):  # for ModelSerializer, fill self .validated_data
+    model = self.Meta.model
+    pk = get_model_pk(model, data)
+    instance = get_model_instances(self, model, [pk]).get(pk) if pk is not None else None
+    if instance is None:
+        raise ValidationError(f'Invalid pk "{data}" - object does not exist.')
+    return instance
 
-class MongoListSerializer(serializers.ListSerializer):
 
-    def __init__(self, instance=None, _id=None, id=None, **kwargs):
+def to_internal_value_model_many(self, data):  # for ModelSerializer when many=True
+    if not isinstance(data, list):
+        raise ValidationError(f'Expected a list of items but got type "{type(data).__name__}".')
+    model = self.child.Meta.model
+    pks = [get_model_pk(model, value) for value in data]
+    instances = get_model_instances(self, model, [pk for pk in pks if pk is not None])
+    errors = [f'Invalid pk "{value}" - object does not exist.' for value, pk in zip(data, pks) if instances.get(pk) is None]
+    if errors:
+        raise ValidationError(errors)
+    return [instances[pk] for pk in pks]
+
+
+NATURAL_KEY_MESSAGE = 'This field is required, it identifies the document (natural key).'
+
+
+def get_model_pk(model, value):  # value is like: 1, '1' or {'id': 1}
+    if isinstance(value, dict):
+        value = value.get('id')
+    try:
+        return model._meta.pk.to_python(value)
+    except (DjangoValidationError, TypeError, ValueError):
+        return None
+
+
+def get_model_instances(serializer, model, pks):
+    # instances of the django models are kept in the context (an identity map per request, shared by the items and
+    # nested fields), only instances not in it are queried by one 'pk__in' query. not existed pks saved as None
+    instances = serializer.context.setdefault('model_instances', {}).setdefault(model, {})
+    missing = [pk for pk in pks if pk not in instances]
+    if missing:
+        instances.update((instance.pk, instance) for instance in resolve_sync(list, model.objects.filter(pk__in=missing)))
+        for pk in missing:
+            instances.setdefault(pk, None)
+    return instances
+
+
+def prefetch_model_instances(serializer, data):
+    # collect pks of all django nested fields in 'data' (list of dicts, nested mongo fields included) and query each
+    # model once, to prevent a query per item in to_internal_value_model
+    pks = {}
+
+    def collect(serializer, dct):
+        if not isinstance(dct, dict):
+            return
+        fields = serializer.fields
+        for entry in serializer.field_plan.nested:
+            value = dct.get(entry.name)
+            if value is None:
+                continue
+            field = fields[entry.name]
+            values = value if entry.many and isinstance(value, list) else [value]
+            if entry.mongo:
+                for item in values:
+                    collect(field.child if entry.many else field, item)
+            else:
+                model = (field.child if entry.many else field).Meta.model
+                pks.setdefault(model, set()).update(get_model_pk(model, item) for item in values)
+
+    for dct in data:
+        collect(serializer, dct)
+    for model_pks in pks.values():
+        model_pks.discard(None)
+    # models queried together (concurrently in async methods)
+    for result in resolve_all([lambda model=model, model_pks=model_pks: get_model_instances(serializer, model, model_pks)
+                               for model, model_pks in pks.items()]):
+        if isinstance(result, Exception):
+            raise result
+
+
+def get_field_plan(serializer):
+    # plan is cached on the serializer's class and rebuilt only when the fields of the class changed (like fields
+    # added in overridden get_fields), so each call of to_internal_value, to_representation... doesn't rediscover them
+    cls = serializer.__class__
+    signature = tuple((field_name, field.__class__, getattr(field, 'many', False), getattr(field, 'mongo', False),
+                       field.read_only, field.source) for field_name, field in serializer.fields.items())
+    plan = cls.__dict__.get('_field_plan')
+    if plan is None or plan.signature != signature:
+        plan = FieldPlan(serializer, signature)
+        cls._field_plan = plan
+    return plan
+
+
+def get_projection(serializer, prefix='', include=()):
+    # find() projection of the fields shown by the serializer, like: {'_id': 1, 'title': 1, 'comments._id': 1,
+    # 'comments.content': 1, 'author': 1}, nested mongo fields (dict or list) are projected by their own fields.
+    # lazy fields (like CompressedField) only projected if their path is in 'include', like ['body', 'comments.body']
+    projection = {}
+    for entry in get_field_plan(serializer).entries:
+        field = serializer.fields[entry.name]
+        if field.write_only or getattr(field, 'lazy', False) and f'{prefix}{entry.name}' not in include:
+            continue
+        if entry.mongo:
+            projection.update(get_projection(field.child if entry.many else field, f'{prefix}{entry.name}.', include))
+        else:
+            projection[f'{prefix}{entry.name}'] = 1
+    return projection
+
+
+def get_embedded_paths(fields, model, prefix=()):
+    # yields django nested fields of 'model' in 'fields' (declared fields of a serializer class, nested mongo fields
+    # included) as (path, field), path like: (('comments', True), ('author', False)) (name of each level, is it a list)
+    for field_name, field in fields.items():
+        if not isinstance(field, serializers.BaseSerializer):
+            continue
+        many = isinstance(field, serializers.ListSerializer)
+        child = field.child if many else field
+        path = prefix + ((field_name, many),)
+        if isinstance(child, MongoSerializer):
+            yield from get_embedded_paths(child._declared_fields, model, path)
+        elif isinstance(child, serializers.ModelSerializer) and 'id' in child.fields and \
+                child.Meta.model._meta.concrete_model is model._meta.concrete_model:
+            yield path, child
+
+
+def get_embedded_targets(model, serializers=None):
+    # every (collection, path, field) where instances of django 'model' are embedded, by MongoSerializer classes with
+    # Meta.model (all subclasses of MongoSerializer if 'serializers' not provided). fields are read from the classes
+    # (declared fields), so serializers with required arguments in __init__ are not instantiated
+    if serializers is None:
+        serializers, classes = [], [MongoSerializer]
+        while classes:
+            cls = classes.pop(0)
+            serializers.append(cls)
+            classes.extend(cls.__subclasses__())
+    targets, seen = [], set()
+    for cls in serializers:
+        collection = getattr(getattr(cls, 'Meta', None), 'model', None)
+        if collection is None:   # nested serializers
+            continue
+        for path, field in get_embedded_paths(cls._declared_fields, model):
+            key = (collection.full_name, path)
+            if key not in seen:      # like a collection used by several serializers
+                seen.add(key)
+                targets.append((collection, path, field))
+    return targets
+
+
+def get_refresh_operation(path, pk):
+    # (filter, path of $set, arrayFilters) of refreshing copies of django instance 'pk' in 'path', the last list is
+    # filtered by '$[e]' and its parent lists by '$[]', like: 'comments.$[].replies.$[e].author' {'e.author.id': pk}
+    lists = [i for i, (name, many) in enumerate(path) if many]
+    names = [name for name, many in path]
+    filter = {'.'.join(names + ['id']): pk}
+    if not lists:
+        return filter, '.'.join(names), None
+    last = lists[-1]
+    set_path = '.'.join(name + ('.$[e]' if i == last else '.$[]' if many else '') for i, (name, many) in enumerate(path))
+    return filter, set_path, [{'.'.join(['e'] + names[last + 1:] + ['id']): pk}]
+
+
+def refresh_embedded(instance, serializers=None, fields=None, chunk_size=1000, resume=None):
+    """
+    refreshes copies of django 'instance' embedded in mongo documents (django nested fields, like blog.author and
+    blog.comments.author by UserNameSerializer) via update_many in the db, 'chunk_size' documents per request.
+    yields progress of each chunk like: {'collection': 'db.blog', 'path': 'comments.$[e].author', 'after': '6523..',
+    'matched': 1000, 'modified': 998}, an interrupted refresh continues by passing the last yielded one as 'resume'
+    fields (like ['username']) refreshes only copies that show one of them
+    """
+    targets = get_embedded_targets(instance.__class__, serializers)
+    if resume is not None:    # targets before the resumed one are done
+        names = [(collection.full_name, get_refresh_operation(path, None)[1]) for collection, path, field in targets]
+        start = names.index((resume['collection'], resume['path']))
+        targets = targets[start:]
+    for collection, path, field in targets:
+        if fields is not None and not any(field.fields[name].source in fields for name in field.fields if name != 'id'):
+            continue
+        filter, set_path, array_filters = get_refresh_operation(path, instance.pk)
+        value = dict(field.to_representation(instance))
+        after = None
+        if resume is not None and resume['collection'] == collection.full_name and resume['path'] == set_path:
+            after = ObjectId(resume['after'])
+        while True:
+            # _ids taken by keyset (refreshed documents still match 'filter')
+            query = {**filter, '_id': {'$gt': after}} if after else filter
+            ids = [document['_id'] for document in
+                   fetch_all(collection.find(query, {'_id': 1}).sort('_id', 1).limit(chunk_size))]
+            if not ids:
+                break
+            result = resolve(collection.update_many({'_id': {'$in': ids}, **filter}, {'$set': {set_path: value}},
+                                                    array_filters=array_filters))
+            evict_cache(collection, ids)
+            after = ids[-1]
+            yield {'collection': collection.full_name, 'path': set_path, 'after': str(after),
+                   'matched': result.matched_count, 'modified': result.modified_count}
+
+
+def connect_refresh(model, serializers=None, chunk_size=1000, run=None):
+    # refreshes embedded copies of instances of 'model' after every save of them (post_save signal, after commit of
+    # the transaction). save(update_fields=[...]) refreshes only copies showing one of the fields
+    # 'run' receives the refresh (function without argument) to run it out of the request, like: run=executor.submit,
+    # otherwise it runs in the request. errors of it are logged (with the last progress, to resume), not raised
+    def receiver(sender, instance, created, update_fields=None, **kwargs):
+        if created:    # not embedded yet
+            return
+        fields = set(update_fields) if update_fields is not None else None
+
+        def refresh():
+            progress = None
+            try:
+                for progress in refresh_embedded(instance, serializers, fields, chunk_size):
+                    pass
+            except Exception:    # the instance is already committed, so raising here only breaks the request
+                logger.exception('refresh of embedded %s %s failed, last progress: %s', model._meta.label,
+                                 instance.pk, progress)
+        transaction.on_commit(refresh if run is None else lambda: run(refresh))
+    post_save.connect(receiver, sender=model, weak=False, dispatch_uid=f'mongoserializer_refresh_{model._meta.label}')
+    return receiver
+
+
+def encode_page_cursor(value, _id):    # value of the sort key and _id of last document of a page, as url safe str
+    return base64.urlsafe_b64encode(bson.encode({'value': value, '_id': _id})).decode()
+
+
+def decode_page_cursor(after):
+    try:
+        cursor = bson.decode(base64.urlsafe_b64decode(after.encode()))
+        return cursor['value'], cursor['_id']
+    except (binascii.Error, BSONError, KeyError, ValueError):
+        raise ValidationError({'after': 'Invalid page cursor.'})
+
+
+class FieldPlan:
+    # precomputed kind of the fields of a serializer class, built once by get_field_plan()
+    def __init__(self, serializer, signature):
+        self.signature = signature
+        self.entries = [FieldPlanEntry(serializer, field_name, field) for field_name, field in serializer.fields.items()]
+        self.writable = [entry for entry in self.entries if not entry.read_only]  # like DRF's _writable_fields
+        self.insert_only = [entry.name for entry in self.entries if entry.insert_only]
+        # changed in every update, so not counted as a change in diff mode
+        self.auto_now = [entry.name for entry in self.entries if getattr(serializer.fields[entry.name], 'auto_now', False)]
+        self.nested = [entry for entry in self.entries if entry.nested]
+
+
+class FieldPlanEntry:
+    __slots__ = ('name', 'nested', 'method', 'many', 'mongo', 'read_only', 'source_attrs', 'query', 'validate_method',
+                 'insert_only')
+
+    def __init__(self, serializer, field_name, field):
+        self.name = field_name
+        self.nested = isinstance(field, serializers.BaseSerializer)   # nested serializer (mongo or django)
+        self.method = isinstance(field, serializers.SerializerMethodField)
+        self.many = self.nested and bool(getattr(field, 'many', False))
+        self.mongo = self.nested and bool(getattr(field, 'mongo', False))   # is mongo|django nested field
+        self.read_only = field.read_only
+        self.source_attrs = field.source_attrs
+        # query of the field relative to its parent, like: 'comments.$.' (list) or 'author.' (dict)
+        self.query = f'{field_name}.$.' if self.many else f'{field_name}.'
+        validate_method = 'validate_' + field_name
+        self.validate_method = validate_method if hasattr(serializer.__class__, validate_method) else None
+        # saved only in creation of the document (like $setOnInsert in upsert)
+        self.insert_only = field_name == '_id' or getattr(field, 'auto_now_add', False) and not getattr(field, 'auto_now', False)
+
+
+class CallAttributes:
+    # attributes of the serializers read from CallState of the running call (like _id of each item of a list), in a
+    # base class, so they don't hide '_id' field of FieldMixin
+    _id = CallAttribute()
+    root_id = CallAttribute()
+    query = CallAttribute()
+    mongo_update = CallAttribute()    # MongoUpdate of the main document, shared with nested fields in updating
+
+
+class MongoListSerializer(CallAttributes, serializers.ListSerializer):
+    batch_size = 1000    # max operations of every bulk_write or values of every $in query, for several documents
+    ordered = True       # if False, insert_many(ordered=False) inserts all valid documents even if some of them fail
+    # in creation, invalid items don't fail .is_valid(), valid items are saved and errors of others returned by index
+    partial_success = False
+    # items validated at once by 'workers' threads (greenlets in async methods), results in order. useful when
+    # validators do I/O (like request to other services)
+    workers = None
+
+    def __init__(self, instance=None, _id=None, id=None, partial_success=None, **kwargs):
         # instance, _id, data... are list, id for django fields, should provide explecitly
         self._id = _id
+        self.write_results = None   # result of saving each document, like: [{'_id': .., 'ok': True}, ..]
+        self.write_errors = None    # errors of the failed documents by index like: {1: ['E11000 duplicate key..']}
+        if partial_success is not None:
+            self.partial_success = partial_success
+        self.item_errors = {}       # validation errors of invalid items in partial_success mode, by index
+        self.valid_indexes = None   # index of the items of validated_data in data
         self.id = id
         self.root_id = _id if _id else None
         self._context = kwargs.get('context', {})
@@ -37,44 +328,146 @@ class MongoListSerializer(serializers.ListSerializer):
             # if the serializer not define Meta (for example in nested fields), 'except' will be run
             self.mongo_collection = self.child.Meta.model
         except:
-            self.mongo_collection = None       # mongo_collection of nested fields sets in .to_internal_value()
+            self.mongo_collection = None       # mongo_collection of nested fields set by the main serializer
         if not self._context:   # self._context converted to None by base classes and cause raising error when setting
             self._context = {}
         # for integrity with 'root_id' and ..., we dont set mongo_collection for ListSerializer (all set in .child)
         self.context.update({'partial': self.partial, 'change': bool(_id or id)})
+        if _id:    # updating, documents have only changed fields
+            self.child.partial = True
 
     def to_internal_value(self, data):
         # parent of list fields is main serializer like 'BlogSerializer'
         if not isinstance(data, list):
             raise ValidationError(f'please provide `list` data type for `{self.__class__.__name__}`')
+        # state of the call given by the parent (nested list), otherwise by arguments of self (main serializer)
+        state = get_call_state(self) or CallState(self, self._id, self.root_id, self.query)
         if getattr(self, 'parent', None) and getattr(self.parent, 'request', None):
-            self.child.mongo_collection = self.mongo_collection = self.parent.mongo_collection
             self.context.update({'request': self.parent.request, 'partial': self.parent.partial,
-                                 'change': bool(self._id or self.id)})
-
-        if self._id or self.root_id:  # self.root_id for update nested documents and self._id for update main document
-            ret = []
-            self.child.root_id = self.root_id
-            self.child.partial = True
-            self.child.mongo_collection = self.mongo_collection
-            self._id = [None for item in data] if not self._id else self._id
-            for id, dct in zip(self._id, data):
-                # _id shared to Serializer and ListSerializer just same (as list), so should be separated here
-                self.child._id = id
-                ret.append(self.child.to_internal_value(dct))
-        else:
-            ret = [self.child.to_internal_value(dct) for dct in data]
+                                 'change': bool(state._id or self.id)})
+
+        ids = None
+        if state._id or state.root_id:  # root_id for update nested documents and _id for update main document
+            # nested documents could be mixed of edited (has _id) and added documents, so _id taken from each of them
+            ids = state._id if self.parent is None else [dct.get('_id') if isinstance(dct, dict) else None for dct in data]
+            data = data[:len(ids)]
+        # each item validated by its own state (its _id), the child itself is not changed
+        states = [state.nested(self.child, ids[index] if ids is not None else None) for index in range(len(data))]
+        with state:
+            errors = self._prefetch_unique_values(data)   # errors of duplicated values inside 'data' by index
+            if self.parent is None:    # nested lists are prefetched by the main serializer
+                prefetch_model_instances(self.child, data)
+            results = self._validate_items(data, states)
+
+        ret = []
+        for index, value in enumerate(results):
+            if isinstance(value, ValidationError):
+                detail = value.detail if isinstance(value.detail, dict) else {api_settings.NON_FIELD_ERRORS_KEY: value.detail}
+                for field_name, messages in errors.get(index, {}).items():
+                    detail.setdefault(field_name, messages)
+                errors[index] = detail
+            elif index not in errors:
+                ret.append(value)
+        if errors and not (self.partial_success and self.parent is None and ids is None):
+            # like DRF, errors is list of all items, {} for valid items
+            raise ValidationError([errors.get(index, {}) for index in range(len(data))])
+        self.item_errors = ValidationError(errors).detail if errors else {}    # messages as ErrorDetail, like DRF
+        self.valid_indexes = [index for index in range(len(data)) if index not in errors]
         return ret
 
+    def _validate_items(self, data, states):
+        # returns validated value or ValidationError of each item, in order of 'data'. each item runs by its own
+        # CallState, so with 'workers' all of them are validated by self.child at once. unique values and django
+        # instances are prefetched (shared in context) before, so workers mostly overlap I/O of custom validators
+        def validate(index):
+            try:
+                with states[index]:
+                    return self.child.to_internal_value(data[index])
+            except ValidationError as exc:
+                return exc
+
+        indexes = range(len(data))
+        if not self.workers or len(data) < 2:
+            return [validate(index) for index in indexes]
+        if in_async():    # each item in its own greenlet, db calls of 'workers' items awaited together
+            results = []
+            for start in range(0, len(data), self.workers):
+                for result in resolve_all([lambda index=index: validate(index) for index in indexes[start:start + self.workers]]):
+                    if isinstance(result, Exception) and not isinstance(result, ValidationError):
+                        raise result
+                    results.append(result)
+            return results
+        with ThreadPoolExecutor(self.workers) as executor:
+            return list(executor.map(validate, indexes))
+
+    def _prefetch_unique_values(self, data):
+        # values of child's fields with MongoUniqueValidator are checked for all items together (results kept in
+        # context and used by the validator of each item), returns duplicated values inside 'data' as errors like:
+        # {3: {'title': ['The title must be unique.']}}
+        errors, pending = {}, []
+        unique_values = self.context.setdefault('unique_values', {})
+        # in creation, natural key fields are not checked with db (upsert), but still checked for duplicates in 'data'
+        upsert_fields = (getattr(self.child, 'natural_key', None) or ()) if not (self._id or self.root_id) else ()
+        for field_name, field in self.child.fields.items():
+            validators = [validator for validator in field.validators if isinstance(validator, MongoUniqueValidator)]
+            if not validators or field.read_only:
+                continue
+            values = {}    # value: index of the first item has the value
+            for index, dct in enumerate(data):
+                try:
+                    value = field.to_internal_value(dct[field_name])
+                    first_index = values.setdefault(value, index)
+                except Exception:    # value not provided or invalid, validates in the item itself
+                    continue
+                if first_index != index:
+                    errors.setdefault(index, {})[field_name] = [validator.message for validator in validators]
+            if field_name in upsert_fields:
+                continue
+            for validator in validators:
+                prefetched = unique_values.setdefault(validator.key, {})
+                pending.append((prefetched, validator, [value for value in values if value not in prefetched]))
+        # values of all validators fetched together (concurrently in async methods)
+        results = resolve_all([lambda validator=validator, values=values: validator.prefetch(values, self.batch_size)
+                               for prefetched, validator, values in pending])
+        for (prefetched, validator, values), result in zip(pending, results):
+            if isinstance(result, Exception):
+                raise result
+            prefetched.update(result)
+        return errors
+
     def save(self):
-        list_of_serialized = [self.child.get_serialized(dct) for dct in self.validated_data]
+        list_of_serialized = self.get_serialized(self.validated_data)
         if not self._id:   # creation phase
             return self.create(list_of_serialized)
         else:             # updating
             return self.update(self._id, list_of_serialized)
 
+    async def ais_valid(self, raise_exception=False):    # .is_valid() with async collection (and async django orm)
+        return await run_async(self.is_valid, raise_exception=raise_exception)
+
+    async def asave(self):
+        return await run_async(self.save)
+
     def create(self, validated_data):
-        return save_to_mongo(self, data=validated_data)
+        if not self.partial_success:
+            return save_to_mongo(self, data=validated_data)
+        # valid items inserted via insert_many(ordered=False), returns only _id or errors of each item of data (not
+        # whole documents), like: [{'_id': ObjectId('..'), 'ok': True}, {'_id': None, 'ok': False, 'errors': {..}}]
+        errors = dict(self.item_errors)
+        if validated_data:
+            try:
+                save_to_mongo(self, data=validated_data)
+            except ValidationError as exc:   # errors of db (like duplicate key) by index of validated_data
+                errors.update((self.valid_indexes[i], error) for i, error in enumerate(exc.detail) if error)
+        ids = dict(zip(self.valid_indexes, (dct.get('_id') for dct in validated_data)))
+        self.write_results = []
+        for index in range(len(self.valid_indexes) + len(self.item_errors)):
+            if index in errors:
+                self.write_results.append({'_id': None, 'ok': False, 'errors': errors[index]})
+            else:
+                self.write_results.append({'_id': ids[index], 'ok': True})
+        self.write_errors = dict(sorted(errors.items()))
+        return self.write_results
 
     def update(self, _id=None, validated_data=None):  # provide validated_data (adding like blog.user.set(user2) or both (editing)
         # if you prefere update via own field, don't call super().update
@@ -83,14 +476,37 @@ class MongoListSerializer(serializers.ListSerializer):
             _id = None
         if not _id:        # for django fields
             _id = [None for dct in validated_data]
+        state = get_call_state(self) or CallState(self, self._id, self.root_id, self.query)
 
-        if self.parent is None and isinstance(self.root_id, list):   # self is main serializer not nested
-            list_of_serialized = []
+        if self.parent is None and isinstance(state.root_id, list):   # self is main serializer not nested
+            # updates of all documents (with their nested fields) collected and saved by bulk_write in batches
+            list_of_serialized, pending_updates = [], []
             for id, dct in zip(_id, validated_data):
-                self.child.root_id = id
-                list_of_serialized.append(self.child.update(id, dct))
+                with CallState(self.child, id, id, parent=state, pending_updates=pending_updates):
+                    list_of_serialized.append(self.child.update(id, dct))
+            if self.child.diff:
+                documents = self.child.document
+                documents = {ObjectId(id): document for id, document in zip(_id, documents)} if documents else None
+                diff_updates(self.mongo_collection or self.child.mongo_collection, pending_updates, documents,
+                             self.child.version_field, self.child.field_plan.auto_now)
+            self.write_results = save_to_mongo(self, update=pending_updates)
+            self.write_errors = {index: result['errors'] for index, result in enumerate(self.write_results)
+                                 if not result['ok']}
         else:
-            list_of_serialized = [self.child.update(id, dct) for id, dct in zip(_id, validated_data)]
+            list_of_serialized = []
+            query, mongo_update = state.query[0], state.mongo_update
+            added_ids = self.context.get('added_ids', ())
+            for id, dct in zip(_id, validated_data):
+                item_query = state.query
+                if self.mongo:    # edited and added documents of a list could be mixed
+                    if not id or id in added_ids:
+                        item_query = (query, 'add_array')
+                    elif mongo_update is not None:  # each edited document matches by its own arrayFilters identifier
+                        item_query = (mongo_update.array_element(query, id), 'edit')
+                    else:
+                        item_query = (query, 'edit')
+                with state.nested(self.child, id, item_query):
+                    list_of_serialized.append(self.child.update(id, dct))
         return list_of_serialized
 
     def serialize_and_filter(self, validated_data):
@@ -101,10 +517,9 @@ class MongoListSerializer(serializers.ListSerializer):
         return serialized
 
     def get_serialized(self, validated_data):
-        # when partial=True, current_class(validated_data) doesn't raise error even doesn't provide required fields
-        current_class = self.__class__
-        serialized = current_class(validated_data, partial=self.partial).data
-        return serialized
+        # serialize by the fields already bound to self (in one pass), instead of building a new serializer instance
+        # (DRF deepcopies all fields of it). when partial=True, doesn't raise error for not provided required fields
+        return self.to_representation(validated_data)
 
     def _field_filtering_for_update(self, validated_data, serialized):
         # Keep only fields provided in validated_data and remove unexpected others (fields with default value,
@@ -121,18 +536,30 @@ class FieldMixin(serializers.Serializer):
     _id = IdMongoField(required=False, mongo_write=True)  # generate ObjId for main and nested serializers in creation
     #root_id = IdMongoField(required=False, mongo_write=True)
 
-class MongoSerializer(FieldMixin, serializers.Serializer):
+class MongoSerializer(FieldMixin, CallAttributes, serializers.Serializer):
 
     class Meta:
         list_serializer_class = MongoListSerializer
 
-    def __init__(self, instance=None, _id=None, request=None, id=None, **kwargs):
+    def __init__(self, instance=None, _id=None, request=None, id=None, document=None, diff=False, **kwargs):
         # instance and _id should not conflict in updating and retrieving like: updating: serializer(_id=1, data={..}),
         # retrieving: serializer(instance).data, id is for django fields
+        # in updating with diff=True (or 'document', current document in db), only changed values are saved
         self._id = _id
+        self.document = document    # list of documents when many=True
+        self.diff = diff or document is not None
+        # field of the document's version, in diff mode the update fails if the document changed after reading it
+        self.version_field = getattr(self.Meta, 'version_field', None)
+        # WriteBehindBuffer, updates of the document (not nested arrays) saved later by it in bulk
+        self.write_behind = getattr(self.Meta, 'write_behind', None)
+        self.write_behind_fields = getattr(self.Meta, 'write_behind_fields', None)   # like {'views': '$inc'}
+        self.bounded_arrays = getattr(self.Meta, 'bounded_arrays', None) or {}    # like {'comments': BoundedArray(50)}
         self.root_id = _id if _id else None
         self.request = request
         self.query = ['', 'edit']   # add/edit
+        self.mongo_update = None
+        # fields identify the document in creation, like ['slug'], saving upserts document instead insert (Meta.natural_key)
+        self.natural_key = getattr(self.Meta, 'natural_key', None)
         self.id = id
         self.mongo = False if id or isinstance(self, serializers.ModelSerializer) else True  # is mongo|django field
         super().__init__(instance=instance, **kwargs)
@@ -140,55 +567,81 @@ class MongoSerializer(FieldMixin, serializers.Serializer):
             # if the serializer not define Meta (for example in nested fields), 'except' will be run
             self.mongo_collection = self.Meta.model
         except:
-            self.mongo_collection = None       # mongo_collection of nested fields sets in .to_internal_value()
+            self.mongo_collection = None       # mongo_collection of nested fields set by the main serializer
         self.fields_items = self.fields.items()  # used in MongoListSerializer to improve optimization (to_internal)
-        for field_name, field in self.fields_items:
-            if isinstance(field, serializers.BaseSerializer):  # for django fields required set field.query
-                field.query = ['', 'edit']
-                if not getattr(field, 'mongo', False):  # django fields
-                    if getattr(field, 'many', False):  # list field
-                        field.to_internal_value = to_internal_value_model_many.__get__(field)
-                    else:
-                        field.to_internal_value = to_internal_value_model.__get__(field)
+        self.field_plan = get_field_plan(self)
+        for entry in self.field_plan.nested:
+            field = self.fields[entry.name]
+            if not entry.mongo:  # django fields
+                if entry.many:  # list field
+                    field.to_internal_value = to_internal_value_model_many.__get__(field)
+                else:
+                    field.to_internal_value = to_internal_value_model.__get__(field)
+            if _id:    # updating, nested fields (in any level) are partial and their fields not required
+                self._unrequired_nested_fields(field)
+        if self.mongo_collection is not None:   # nested fields (in any level) are saved in the same collection
+            self._share_collection(self, self.mongo_collection)
         self.context.update({'request': request, 'partial': self.partial, 'change': bool(_id)})
 
+    def _share_collection(self, serializer, collection):
+        fields = serializer.fields
+        for entry in serializer.field_plan.nested:
+            field = fields[entry.name]
+            field.mongo_collection = collection
+            if entry.many:
+                field.child.mongo_collection = collection
+            nested = field.child if entry.many else field
+            if entry.mongo and isinstance(nested, MongoSerializer):
+                self._share_collection(nested, collection)
+
     def _unrequired_nested_fields(self, serializer):
-        if isinstance(serializer, serializers.BaseSerializer):
+        # every nested serializer walks only once, nested .to_internal_value() and .to_representation() calls reach
+        # here again for the same fields
+        if isinstance(serializer, serializers.BaseSerializer) and not getattr(serializer, '_unrequired', False):
+            serializer._unrequired = True
+            serializer.partial = True
             if hasattr(serializer, 'many') and serializer.many:
-                for field_name, field in serializer.child.fields.items():
-                    field.required = False
-                    self._unrequired_nested_fields(field)
-
+                serializer.child._unrequired = True
+                serializer.child.partial = True
+                fields = serializer.child.fields
             else:
-                for field_name, field in serializer.fields.items():
-                    field.required = False
-                    self._unrequired_nested_fields(field)
+                fields = serializer.fields
+            for field_name, field in fields.items():
+                field.required = False
+                self._unrequired_nested_fields(field)
 
     def to_representation(self, instance):
-        if isinstance(instance, dict):
+        if isinstance(instance, (dict, Mapping)):     # dict, or LazyBSONDocument of read phase (raw=True)
             ret = {}
-            for field_name, field in self.fields.items():
-                if self.partial:       # fields reset when came to to_representation, so required setting again
+            fields = self.fields
+            if self.partial:       # fields reset when came to to_representation, so required setting again
+                for field in fields.values():
                     field.required = False
-                    if isinstance(field, serializers.BaseSerializer):
-                        field.partial = True  # for nested fields, required setting partial = True
-                        if hasattr(field, 'many') and field.many:
-                            field.child.partial = True  # field's child came here from ListSerializer.to_representation
+                for entry in self.field_plan.nested:
+                    field = fields[entry.name]
+                    field.partial = True  # for nested fields, required setting partial = True
+                    if entry.many:
+                        field.child.partial = True  # field's child came here from ListSerializer.to_representation
                     self._unrequired_nested_fields(serializer=field)
 
+            for entry in self.field_plan.entries:
+                field_name, field = entry.name, fields[entry.name]
                 try:
                     value = instance[field_name]
-                    if isinstance(field, serializers.SerializerMethodField):
+                    if entry.method:
                         method = getattr(self, f'get_{field_name}')
-                        if method(instance):     # prevent 'None' value came to db in SerializerMethodField fields
-                            ret[field_name] = method(instance)
-                    elif isinstance(field, serializers.BaseSerializer):   # field is a nested serializer
-                        field.instance = value
-                        ret[field_name] = field.data
+                        method_value = method(instance)
+                        if method_value:     # prevent 'None' value came to db in SerializerMethodField fields
+                            ret[field_name] = method_value
+                    elif entry.nested:   # field is a nested serializer
+                        # field.data is cached in the field, so can't be used for next items (many=True)
+                        ret[field_name] = field.to_representation(value) if value is not None else None
                     else:                      # field is normal field like CharField, ...
                         ret[field_name] = field.to_representation(value)
                 except KeyError:
-                    if field.default is not empty:         # field.default == '' | 0 | None | some_value
+                    if getattr(field, 'lazy', False):    # not fetched (projection)
+                        continue
+                    elif field.default is not empty:         # field.default == '' | 0 | None | some_value
                         ret[field_name] = field.default
                     # if only one of 'allow_blank', 'allow_null' be False or required=True will not raise 'required' error
                     elif getattr(field, 'allow_blank', False) or getattr(field, 'allow_null', False) or not getattr(field, 'required', True):
@@ -226,85 +679,96 @@ class MongoSerializer(FieldMixin, serializers.Serializer):
 
         return (False, data)
 
-    def _super_internal_value(self, data):
+    def _super_internal_value(self, data, state, states):
         # ListSerializer calls: child.run_validation -> child.to_internal_value
+        # 'states' is CallState of nested fields (in updating), other fields run by 'state' (state of self)
         ret = OrderedDict()
         errors = OrderedDict()
-        fields = self._writable_fields
+        fields = self.fields
 
-        for field in fields:
-            validate_method = getattr(self, 'validate_' + field.field_name, None)
+        for entry in self.field_plan.writable:
+            field = fields[entry.name]
+            validate_method = getattr(self, entry.validate_method) if entry.validate_method else None
             primitive_value = field.get_value(data)
             try:
-                if isinstance(field, serializers.BaseSerializer) and not getattr(field, 'mongo', False):
+                if entry.nested and not entry.mongo:
                     # for django fields don't validate (raise error)
-                    (is_empty_value, data) = self.validate_empty_values_django(primitive_value)
+                    (is_empty_value, value) = self.validate_empty_values_django(primitive_value)
                     if is_empty_value:
-                        validated_value = data    # just like default DRF implementation, otherwise could raise error
+                        validated_value = value    # just like default DRF implementation, otherwise could raise error
                     validated_value = field.to_internal_value(primitive_value)
                 else:
-                    validated_value = field.run_validation(primitive_value)
+                    with states.get(entry.name, state):
+                        validated_value = field.run_validation(primitive_value)
 
                 if validate_method is not None:
                     validated_value = validate_method(validated_value)
             except ValidationError as exc:
-                errors[field.field_name] = exc.detail
+                errors[entry.name] = exc.detail
             except DjangoValidationError as exc:
-                errors[field.field_name] = get_error_detail(exc)
+                errors[entry.name] = get_error_detail(exc)
             except SkipField:
                 pass
             else:
                 # Directly assign the value in the OrderedDict
                 nested_dict = ret
-                for attr in field.source_attrs[:-1]:
+                for attr in entry.source_attrs[:-1]:
                     nested_dict = nested_dict.setdefault(attr, OrderedDict())
-                nested_dict[field.source_attrs[-1]] = validated_value
+                nested_dict[entry.source_attrs[-1]] = validated_value
+        if self.natural_key and not (state._id or state.root_id):
+            # in creation the document is upserted by its natural key, so a missing key would match (and override)
+            # any other document without it
+            for key in self.natural_key:
+                if ret.get(key) is None and key not in errors:
+                    errors[key] = [NATURAL_KEY_MESSAGE]
         if errors:
             raise ValidationError(errors)
         return ret
 
     def to_internal_value(self, data):   # data must be dict (not list)
-        if self._id or self.root_id:  # self.root_id for update nested documents and self._id for update main document
-            for field_name, field in self.fields.items():
+        if not isinstance(data, Mapping):   # like DRF, so an item of many=True (like 5) fails by its index
+            message = self.error_messages['invalid'].format(datatype=type(data).__name__)
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]}, code='invalid')
+        # state of the call given by the parent (nested field or item of a list), otherwise by arguments of self
+        state = get_call_state(self) or CallState(self, self._id, self.root_id, self.query)
+        if self.parent is None:    # django instances of nested fields (in any level) queried here together
+            prefetch_model_instances(self, [data])
+        states = {}    # CallState of nested mongo fields in updating, _id and mode by their value
+        if state._id or state.root_id:  # root_id for update nested documents and _id for update main document
+            fields = self.fields
+            for entry in self.field_plan.nested:
+                field_name, field = entry.name, fields[entry.name]
                 value = data.get(field_name)
-                self._unrequired_nested_fields(field)
-                if isinstance(field, serializers.BaseSerializer) and data.get(field_name):
-                    if (isinstance(value, list) and not getattr(field, 'many', False)) or (isinstance(value, dict) and getattr(field, 'many', False)):
+                if value:
+                    if (isinstance(value, list) and not entry.many) or (isinstance(value, dict) and entry.many):
                         raise ValidationError(f'please provide right data type based on `many` argument for `{field_name}`')
-                    field.partial = True  # being in update (_id==True equal to partial true)
-                    field.mongo_collection = self.mongo_collection
-                    field.root_id = self.root_id
-                    if getattr(field, 'many', False):  # list field
-                        if not getattr(field, 'mongo', False):  # django serializer, value is like: [1, 3, 5]
-                            field.query = field.child.query = ['', 'add_array']  # add dict to the nested array db field
-                        elif not value[0].get('_id'):
-                            # we have to distinguish _id added via IdMongo and _id put by user
-                            field.query[1] = field.child.query[1] = 'add_array'  # add dict to the nested array db field
-                        else:   # value[0].get('_id')
-                            field.query[1] = field.child.query[1] = 'edit'
-                            field._id = [dct['_id'] for dct in value]
-                        field.to_internal_value(value)  # convert to dict and return (via child.to_internal_value)
-
-                    else:        # single (dict) field
-                        if not getattr(field, 'mongo', False):  # django serializer
-                            field.query = ['', 'add_dict']  # add the dict dada to the nested dict field in db
-                        elif not value.get('_id'):
-                            field.query[1] = 'add_dict'
-                        else:  # value.get('_id'):
-                            field.query[1] = 'edit'
-                            field._id = value.get('_id')
-        #return super().to_internal_value(data=data)
-        return self._super_internal_value(data)   # super() could override field attributes
+                    if not entry.mongo:    # django serializer, validated by its own to_internal_value
+                        continue
+                    if entry.many:  # list field, _id of each document taken by the list
+                        first = value[0] if isinstance(value[0], Mapping) else {}
+                        # we have to distinguish _id added via IdMongo and _id put by user
+                        states[field_name] = state.nested(field, query=('', 'edit' if first.get('_id') else 'add_array'))
+                    else:        # single (dict) field, added to the nested dict field in db or edited
+                        nested_id = value.get('_id')
+                        states[field_name] = state.nested(field, nested_id, ('', 'edit' if nested_id else 'add_dict'))
+        with state:
+            return self._super_internal_value(data, state, states)
 
     def save(self, **kwargs):
-        # serialization must be done here rather that create and update, because multiply calling
-        # get_serialized(..) (by main serializer and its nested fields), raise error
+        # serialization must be done here rather that create and update, so nested fields' .update receive
+        # serialized data. serialized is a new dict (built by already bound fields), so kwargs can merge in place
         serialized = self.get_serialized(self.validated_data)
-        serialized = {**serialized, **kwargs}
+        serialized.update(kwargs)
         if not self._id:   # creation phase
-            return self.create(serialized, **kwargs)
+            return self.create(serialized)
         else:             # updating
-            return self.update(self._id, serialized, **kwargs)
+            return self.update(self._id, serialized)
+
+    async def ais_valid(self, raise_exception=False):    # .is_valid() with async collection (and async django orm)
+        return await run_async(self.is_valid, raise_exception=raise_exception)
+
+    async def asave(self, **kwargs):
+        return await run_async(self.save, **kwargs)
 
     def create(self, validated_data):
         return save_to_mongo(serializer=self, data=validated_data)
@@ -313,54 +777,67 @@ class MongoSerializer(FieldMixin, serializers.Serializer):
         if validated_data is None:
             validated_data = _id
             _id = None
-        # because partial=True don't raise error when 'validated_data' doesn't provide required fields
-        return_serialized = deepcopy(validated_data)
-        for field_name, field in self.fields_items:
-            # field value could be None or 0
-            if isinstance(field, serializers.BaseSerializer) and validated_data.get(field_name):  # nested Serializer
-                # every serializer field should define its own .update to update
-                value = validated_data.get(field_name)
-                if getattr(field, 'mongo', False):
-                    field.mongo_collection = self.mongo_collection  # fields attrs reset in to_internal_value so set again
-                    field.root_id = self.root_id
-                    if getattr(field, 'many', False):     # list value
-                        field.child.mongo_collection = self.mongo_collection  # fields attrs reset in to_internal_value so set again
-                        field.child.root_id = self.root_id
-                        if value[0].get('_id'):  # edit document of the serializer's field
-                            if field.query[1] == 'add_array':
-                                keys = [dic['_id'] for dic in value if dic.get('_id')]  # _id created by IdMongoField
-                            else:
-                                keys = [dic.pop('_id') for dic in value if dic.get('_id')]
-                        else:       # add document to the serializer field (only one level nested)
-                            keys = None
-                        field.query[0] = field.child.query[0] = f'{field.parent.query[0]}{field_name}.$.' if field.parent.query[0] else f'{field_name}.$.'  # .$. is required here, for next queries
-                        field.update(keys, value)
-                    else:      # dict value
-                        if value.get('_id'):
-                            if field.query[1] == 'add_dict':
-                                _id = value['_id']  # _id created by IdMongoField
-                            else:
-                                _id = value.pop('_id')
-                        else:       # add document to the serializer field (only one level nested)
-                            _id = None
-                        field.query[0] = f'{field.parent.query[0]}{field_name}.' if field.parent.query[0] else f'{field_name}.'
-                        field.update(_id, value)
-
-                else:        # django serializer field (update or refresh values)
-                    if getattr(field, 'many', False):
-                        field.mongo_collection = field.child.mongo_collection = self.mongo_collection
-                        field.query[0] = field.child.query[0] = f'{field.parent.query[0]}{field_name}.$.' if field.parent.query[0] else f'{field_name}.$.'  # .$. is required here, for next queries
-                        id = [item['id'] for item in value]
-                    else:
-                        field.mongo_collection = self.mongo_collection
-                        field.query[0] = f'{field.parent.query[0]}{field_name}.' if field.parent.query[0] else f'{field_name}.'
-                        id = value['id']
-                    save_to_mongo(field, id=id, data=value, root_id=self.root_id)
-                del validated_data[field_name]
-        if validated_data:
-            root_id = None if self.root_id == _id else self.root_id
-            save_to_mongo(self, _id, data=validated_data, root_id=root_id)
-        return return_serialized
+        # state of the call given by the parent (nested field or item of a list), otherwise by arguments of self
+        state = get_call_state(self) or CallState(self, self._id, self.root_id, self.query)
+        is_root = not state.root_id or state.root_id == _id
+        if is_root:   # all updates of the document (main and nested fields) collected and saved by one update_one
+            state.mongo_update = MongoUpdate(state.root_id or _id)
+            state.mongo_update.bounded = self.bounded_arrays
+        elif state.query[1] in ('add_array', 'add_dict'):
+            # the added nested document is saved along its own nested fields (like a comment with its replies)
+            save_to_mongo(self, _id, data=validated_data, root_id=state.root_id, update=state.mongo_update,
+                          query=state.query)
+            return validated_data
+
+        # 'validated_data' is returned untouched, so only the levels changed here are copied (instead deepcopy)
+        root_data = dict(validated_data)   # nested fields are removed from it, they are saved by their own .update
+        fields = self.fields
+        with state:
+            for entry in self.field_plan.nested:
+                field_name, field = entry.name, fields[entry.name]
+                # field value could be None or 0
+                if validated_data.get(field_name):  # nested Serializer
+                    # every serializer field should define its own .update to update
+                    value = validated_data.get(field_name)
+                    field_query = f'{state.query[0]}{entry.query}'  # .$. is required for list fields, for next queries
+                    if entry.mongo:
+                        # _id of added documents created by IdMongoField (saved with the document), otherwise _id is
+                        # only identifier of the edited document
+                        added_ids = self.context.get('added_ids', ())
+                        if entry.many:     # list value, query of each document set by the list
+                            keys = [dic.get('_id') for dic in value]
+                            value = [dic if dic.get('_id') in added_ids else {key: v for key, v in dic.items() if key != '_id'}
+                                     for dic in value]
+                            with state.nested(field, query=(field_query, 'edit')):
+                                field.update(keys, value)
+                        else:      # dict value
+                            nested_id = value.get('_id')
+                            if nested_id and nested_id not in added_ids:  # edit document of the serializer's field
+                                mode = 'edit'
+                                value = {key: v for key, v in value.items() if key != '_id'}
+                            else:       # add document to the serializer field
+                                mode = 'add_dict'
+                            with state.nested(field, nested_id, (field_query, mode)):
+                                field.update(nested_id, value)
+
+                    else:        # django serializer field (update or refresh values)
+                        id = [item['id'] for item in value] if entry.many else value['id']
+                        save_to_mongo(field, id=id, data=value, root_id=state.root_id, update=state.mongo_update,
+                                      query=(field_query, 'add_array' if entry.many else 'add_dict'))
+                    del root_data[field_name]
+            if root_data:
+                root_id = None if state.root_id == _id else state.root_id
+                save_to_mongo(self, _id, data=root_data, root_id=root_id, update=state.mongo_update, query=state.query)
+        if is_root:
+            if state.pending_updates is not None:
+                state.pending_updates.append(state.mongo_update)
+            else:
+                if self.diff:
+                    documents = {ObjectId(state.mongo_update.root_id): self.document} if self.document is not None else None
+                    diff_updates(self.mongo_collection, [state.mongo_update], documents, self.version_field,
+                                 self.field_plan.auto_now)
+                save_to_mongo(self, update=state.mongo_update)
+        return validated_data
 
     def serialize_and_filter(self, validated_data):
         # serialize and next, keep only fields provided in request.data and remove unexpected others
@@ -370,10 +847,9 @@ class MongoSerializer(FieldMixin, serializers.Serializer):
         return serialized
 
     def get_serialized(self, validated_data):
-        # when partial=True, current_class(validated_data) doesn't raise error even doesn't provide required fields
-        current_class = self.__class__
-        serialized = current_class(validated_data, partial=self.partial).data
-        return serialized
+        # serialize by the fields already bound to self (in one pass), instead of building a new serializer instance
+        # (DRF deepcopies all fields of it). when partial=True, doesn't raise error for not provided required fields
+        return self.to_representation(validated_data)
 
     def _field_filtering_for_update(self, validated_data, serialized):
         # Keep only fields provided in validated_data and remove unexpected others (fields with default value,
@@ -384,6 +860,129 @@ class MongoSerializer(FieldMixin, serializers.Serializer):
             filtered_serialized = {key: value for key, value in serialized.items() if getattr(validated_data, key)}
         return filtered_serialized
 
+    @classmethod
+    def find_page(cls, filter=None, after=None, limit=20, sort_key='_id', direction=1, request=None, raw=False,
+                  include=()):
+        """
+        returns a page of documents of Meta.model like: {'results': [...], 'next': 'FwAAAA...'}, fetched only with the
+        fields of the serializer (projection) and serialized via .to_representation. pages are taken via keyset
+        (documents after 'next' of previous page by (sort_key, _id)) instead of skip, so every page costs just its
+        size, needs index of (sort_key, _id) for other sort keys. 'next' is None in the last page. documents with
+        null or missing sort_key come first (last with direction=-1), like sort of mongo
+        raw=True fetches documents as LazyBSONDocument, so only the fields used by the serializer are decoded
+        lazy fields (like CompressedField) are fetched only if their path is in 'include', like ['body']
+        """
+        serializer = cls(request=request)
+        projection = get_projection(serializer, include=include)
+        projection['_id'] = 1
+        if not any(sort_key == key or sort_key.startswith(key + '.') for key in projection):
+            projection[sort_key] = 1     # required for the page cursor (path collision if its parent projected)
+        sort = [('_id', direction)] if sort_key == '_id' else [(sort_key, direction), ('_id', direction)]
+        query = dict(filter or {})
+        if after:
+            value, _id = decode_page_cursor(after)
+            operator = '$gt' if direction == 1 else '$lt'
+            if sort_key == '_id':
+                keyset = {'_id': {operator: _id}}
+            else:    # documents with same value of sort_key ordered by _id
+                # null and missing values sort first (like bson), but {'$gt': None} or {'$lt': ..} don't match them
+                if value is None:
+                    keyset = {'$or': [{sort_key: None, '_id': {operator: _id}}, {sort_key: {'$ne': None}}]} \
+                        if direction == 1 else {sort_key: None, '_id': {operator: _id}}
+                else:
+                    keyset = {'$or': [{sort_key: {operator: value}}, {sort_key: value, '_id': {operator: _id}}]}
+                    if direction != 1:
+                        keyset['$or'].append({sort_key: None})
+            query = {'$and': [query, keyset]} if query else keyset
+        collection = serializer.mongo_collection
+        if raw:
+            collection = collection.with_options(
+                codec_options=collection.codec_options.with_options(document_class=LazyBSONDocument))
+        documents = fetch_all(collection.find(query, projection).sort(sort).limit(limit + 1))
+        next_cursor = None
+        if len(documents) > limit:      # one more document fetched, so there is a next page
+            documents = documents[:limit]
+            last = documents[-1]
+            value = last
+            for key in sort_key.split('.'):    # sort_key could be path of nested field like 'author.id'
+                value = value.get(key) if isinstance(value, Mapping) else None
+            next_cursor = encode_page_cursor(value, last['_id'])
+        return {'results': [serializer.to_representation(document) for document in documents], 'next': next_cursor}
+
+    @classmethod
+    async def afind_page(cls, *args, **kwargs):    # .find_page() with async collection
+        return await run_async(cls.find_page, *args, **kwargs)
+
+    @classmethod
+    def find_one(cls, _id, request=None, include=()):
+        """
+        returns the document of Meta.model by its _id serialized via .to_representation (None if not exists), fetched
+        only with the fields of the serializer. if a cache is set for the collection (set_document_cache), documents
+        read from the cache and saved in it when missed. lazy fields are fetched only if in 'include' (like find_page)
+        """
+        serializer = cls(request=request)
+        collection = serializer.mongo_collection
+        projection = get_projection(serializer, include=include)
+        projection['_id'] = 1
+        _id = ObjectId(_id)
+        cache = document_caches.get(collection.full_name)
+        cache_key = tuple(sorted(projection))
+        document = cache.get(collection, _id, cache_key) if cache is not None else None
+        if document is None:
+            # taken before reading, so the document isn't cached if a write evicts it while reading
+            version = cache.version(collection, _id) if cache is not None else None
+            document = resolve(collection.find_one({'_id': _id}, projection))
+            if document is None:
+                return None
+            if cache is not None:
+                cache.set(collection, _id, cache_key, document, version)
+        return serializer.to_representation(document)
+
+    @classmethod
+    async def afind_one(cls, *args, **kwargs):    # .find_one() with async collection
+        return await run_async(cls.find_one, *args, **kwargs)
+
+    @classmethod
+    def find_array_page(cls, _id, field_name, after=None, limit=20, request=None):
+        """
+        returns a page of elements of the bounded array 'field_name' (Meta.bounded_arrays) of document '_id' newest
+        first, like: {'results': [...], 'next': 'FwAAAA...'}, continues from the array of the document to its buckets.
+        serialized via the nested field, 'next' is None in the last page
+        """
+        serializer = cls(request=request)
+        bounded = serializer.bounded_arrays[field_name]
+        field = serializer.fields[field_name].child
+        element_id = decode_page_cursor(after)[1] if after else None
+        elements, last = bounded.read(serializer.mongo_collection, field_name, _id, element_id, limit)
+        return {'results': [field.to_representation(element) for element in elements],
+                'next': encode_page_cursor(None, last) if last is not None else None}
+
+    @classmethod
+    def ingest(cls, data, chunk_size=1000, **kwargs):
+        """
+        validate and insert documents of 'data' (NDJSON file or str, or any iterable of dicts) chunk by chunk, so memory
+        doesn't depend on size of 'data'. each chunk inserted via insert_many(ordered=False), yields result of each
+        chunk like:
+        {'start': 0, 'count': 1000, 'inserted': 998, 'errors': {3: {'title': [...]}, 51: {...}}}
+        errors are by index of the documents in whole 'data'. kwargs passed to the serializer (like request=request)
+        """
+        documents = read_documents(data)
+        while True:
+            chunk = list(islice(documents, chunk_size))
+            if not chunk:
+                break
+            start = chunk[0][0]
+            errors = {index: {api_settings.NON_FIELD_ERRORS_KEY: [error]} for index, document, error in chunk if error}
+            valid = [(index, document) for index, document, error in chunk if not error]
+            inserted = 0
+            if valid:   # invalid documents are skipped in the same validation (partial_success)
+                serializer = cls(data=[document for index, document in valid], many=True, partial_success=True, **kwargs)
+                serializer.is_valid(raise_exception=True)
+                serializer.save()
+                errors.update((valid[i][0], error) for i, error in serializer.write_errors.items())
+                inserted = len(valid) - len(serializer.write_errors)
+            yield {'start': start, 'count': len(chunk), 'inserted': inserted, 'errors': dict(sorted(errors.items()))}
+
     @classmethod
     def many_init(cls, *args, **kwargs):
         """
@@ -392,6 +991,7 @@ class MongoSerializer(FieldMixin, serializers.Serializer):
         list_serializer_class = cls.Meta.list_serializer_class or MongoListSerializer
         if issubclass(list_serializer_class, MongoListSerializer):  # return True if is MongoListSerializer or subclass
             # custom operation for 'MongoListSerializer'
+            partial_success = kwargs.pop('partial_success', None)
             kwargs['child'] = cls(*args, **kwargs)
 
             # add all arguments of ListSerializer manually (without args, kwargs), because passing custom arguments of
@@ -405,7 +1005,7 @@ class MongoSerializer(FieldMixin, serializers.Serializer):
             child, allow_empty, max_length, min_length = kwargs['child'], kwargs.get('allow_empty'), kwargs.get('max_length'), kwargs.get('min_length')
             data, partial = kwargs.get('data', empty), kwargs.get('partial')
             context, many = kwargs.get('context'), kwargs.get('many')
-            return list_serializer_class(instance, _id=_id, id=id,
+            return list_serializer_class(instance, _id=_id, id=id, partial_success=partial_success,
                                          child=child, allow_empty=allow_empty, max_length=max_length, min_length=min_length,
                                          data=data, partial=partial, context=context, many=many,
                                          read_only=kwargs.get('read_only', False), write_only=kwargs.get('write_only', False), required=kwargs.get('required', None), default=kwargs.get('default', empty), initial=kwargs.get('initial', empty), source=kwargs.get('source'), label=kwargs.get('label'), help_text=kwargs.get('help_text'), style=kwargs.get('style'), error_messages=kwargs.get('error_messages'), validators=kwargs.get('validators'), allow_null=kwargs.get('allow_null', False))
@@ -3,10 +3,12 @@ from setuptools import setup, find_packages
 setup(
     name='mongoserializer',
     version='1.0.2',
-    packages=['mongoserializer'],
+    packages=['mongoserializer', 'mongoserializer.management', 'mongoserializer.management.commands'],
     install_requires=["django", "djangorestframework", "pymongo"],
     extras_require={
-        'jalali': ['jdatetime']
+        'jalali': ['jdatetime'],
+        'async': ['greenlet'],
+        'numpy': ['numpy']
     },
     author='Ahmad Khalili',
     author_email='ahmadkhalili2020@gmail.com',
@@ -0,0 +1,279 @@
+import asyncio
+import copy
+import unittest
+
+import django
+from django.conf import settings
+
+if not settings.configured:
+    settings.configure(INSTALLED_APPS=['django.contrib.contenttypes', 'django.contrib.auth', 'rest_framework'],
+                       DATABASES={}, USE_I18N=True, LANGUAGE_CODE='en')
+    django.setup()
+
+from bson import ObjectId
+from pymongo import InsertOne, UpdateOne
+from rest_framework import serializers
+
+from mongoserializer.serializer import MongoSerializer, MongoListSerializer
+from mongoserializer.methods import MongoUniqueValidator
+
+
+class Result:    # like results of pymongo (InsertOneResult, UpdateResult, BulkWriteResult...)
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class Cursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, *args, **kwargs):
+        return self
+
+    def limit(self, count):
+        return Cursor(self.documents[:count]) if count else self
+
+    def __iter__(self):
+        return iter(self.documents)
+
+
+class AsyncCursor(Cursor):
+    async def to_list(self, length=None):
+        return list(self.documents)
+
+
+class MemoryCollection:
+    # minimal in-memory stand-in of a pymongo collection: filters by equality, $in and $ne of top level fields,
+    # updates by $set (top level), $push ($each) and $inc. every call is recorded in 'calls' like ('insert_one', doc)
+    def __init__(self, full_name):
+        self.full_name = full_name
+        self.documents = []
+        self.calls = []
+
+    def record(self, name, *args):
+        self.calls.append((name, *copy.deepcopy(args)))
+
+    def matches(self, document, filter):
+        for key, condition in filter.items():
+            value = document.get(key)
+            if isinstance(condition, dict) and '$in' in condition:
+                if value not in condition['$in']:
+                    return False
+            elif isinstance(condition, dict) and '$ne' in condition:
+                if value == condition['$ne']:
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    def project(self, document, projection):
+        if not projection:
+            return dict(document)
+        return {key: value for key, value in document.items() if key == '_id' or projection.get(key)}
+
+    def apply(self, document, update):
+        for key, value in update.get('$set', {}).items():
+            document[key] = value
+        for key, value in update.get('$inc', {}).items():
+            document[key] = document.get(key, 0) + value
+        for key, value in update.get('$push', {}).items():
+            document.setdefault(key, []).extend(value['$each'] if isinstance(value, dict) else [value])
+
+    def _insert(self, document):
+        document.setdefault('_id', ObjectId())
+        self.documents.append(copy.deepcopy(document))
+        return document['_id']
+
+    def _update(self, filter, update, upsert=False):
+        document = next((document for document in self.documents if self.matches(document, filter)), None)
+        if document is None:
+            return 0
+        self.apply(document, update)
+        return 1
+
+    def find_one(self, filter=None, projection=None, **kwargs):
+        self.record('find_one', filter, projection)
+        document = next((document for document in self.documents if self.matches(document, filter or {})), None)
+        return self.project(document, projection) if document is not None else None
+
+    def find(self, filter=None, projection=None, **kwargs):
+        self.record('find', filter, projection)
+        return Cursor([self.project(document, projection) for document in self.documents
+                       if self.matches(document, filter or {})])
+
+    def insert_one(self, document, **kwargs):
+        self.record('insert_one', document)
+        return Result(inserted_id=self._insert(document))
+
+    def insert_many(self, documents, ordered=True, **kwargs):
+        self.record('insert_many', documents, ordered)
+        return Result(inserted_ids=[self._insert(document) for document in documents])
+
+    def update_one(self, filter, update, upsert=False, array_filters=None, **kwargs):
+        self.record('update_one', filter, update, array_filters)
+        matched = self._update(filter, update)
+        return Result(matched_count=matched, modified_count=matched, upserted_id=None)
+
+    def bulk_write(self, operations, ordered=True, **kwargs):
+        self.record('bulk_write', [(type(operation).__name__, operation._filter if isinstance(operation, UpdateOne)
+                                    else operation._doc, getattr(operation, '_doc', None)) for operation in operations])
+        matched = 0
+        for operation in operations:
+            if isinstance(operation, InsertOne):
+                self._insert(operation._doc)
+            else:
+                matched += self._update(operation._filter, operation._doc)
+        return Result(matched_count=matched, modified_count=matched, upserted_ids={})
+
+
+class AsyncMemoryCollection(MemoryCollection):
+    # same collection with awaitable methods (like pymongo's AsyncCollection), find() returns a cursor with async to_list
+    async def find_one(self, *args, **kwargs):
+        return super().find_one(*args, **kwargs)
+
+    def find(self, *args, **kwargs):
+        return AsyncCursor(super().find(*args, **kwargs).documents)
+
+    async def insert_one(self, *args, **kwargs):
+        return super().insert_one(*args, **kwargs)
+
+    async def insert_many(self, *args, **kwargs):
+        return super().insert_many(*args, **kwargs)
+
+    async def update_one(self, *args, **kwargs):
+        return super().update_one(*args, **kwargs)
+
+    async def bulk_write(self, *args, **kwargs):
+        return super().bulk_write(*args, **kwargs)
+
+
+def get_serializer(collection, workers=None):    # same serializer for sync and async collections
+    class ListSerializer(MongoListSerializer):
+        pass
+    ListSerializer.workers = workers
+
+    class CommentSerializer(MongoSerializer):
+        content = serializers.CharField()
+
+    class BlogSerializer(MongoSerializer):
+        title = serializers.CharField(validators=[MongoUniqueValidator(collection, 'title')])
+        views = serializers.IntegerField(required=False)
+        comments = CommentSerializer(many=True, required=False)
+
+        class Meta:
+            model = collection
+            list_serializer_class = ListSerializer
+    return BlogSerializer
+
+
+def normalize(value, ids):
+    # ObjectIds (different in every run) replaced by their order of appearance
+    if isinstance(value, ObjectId):
+        return f'id{ids.setdefault(value, len(ids))}'
+    if isinstance(value, dict):
+        return {key: normalize(item, ids) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(item, ids) for item in value]
+    return value
+
+
+class AsyncParityTest(unittest.TestCase):
+    # the same steps run by sync methods on MemoryCollection and by async methods on AsyncMemoryCollection, both should
+    # send the same calls to the collection and return the same errors
+
+    workers = None
+
+    def run_sync(self, steps):
+        collection = MemoryCollection('db.blog')
+        serializer_class = get_serializer(collection, self.workers)
+        results = []
+        for kwargs in steps(collection):
+            serializer = serializer_class(**kwargs)
+            if serializer.is_valid():
+                serializer.save()
+            results.append(serializer.errors)
+        return normalize(collection.calls, {}), results
+
+    def run_async(self, steps):
+        collection = AsyncMemoryCollection('db.blog')
+        serializer_class = get_serializer(collection, self.workers)
+
+        async def run():
+            results = []
+            for kwargs in steps(collection):
+                serializer = serializer_class(**kwargs)
+                if await serializer.ais_valid():
+                    await serializer.asave()
+                results.append(serializer.errors)
+            return results
+        results = asyncio.run(run())
+        return normalize(collection.calls, {}), results
+
+    def assert_parity(self, steps):
+        sync_calls, sync_errors = self.run_sync(steps)
+        async_calls, async_errors = self.run_async(steps)
+        self.assertEqual(sync_calls, async_calls)
+        self.assertEqual(sync_errors, async_errors)
+        return sync_calls, sync_errors
+
+    def test_create(self):
+        calls, errors = self.assert_parity(lambda collection: [
+            {'data': {'title': 'b1', 'comments': [{'content': 'c1'}]}},
+            {'data': {'title': 'b1'}},     # duplicate
+        ])
+        self.assertEqual(errors, [{}, {'title': ['The title must be unique.']}])
+        self.assertEqual([call[0] for call in calls], ['find_one', 'insert_one', 'find_one'])
+
+    def test_create_many(self):
+        calls, errors = self.assert_parity(lambda collection: [
+            {'data': [{'title': 'b1'}, {'title': 'b2'}], 'many': True},
+            {'data': [{'title': 'b3'}, {'title': 'b2'}, {'title': 'b3'}], 'many': True},
+        ])
+        self.assertEqual(errors[1], [{}, {'title': ['The title must be unique.']}, {'title': ['The title must be unique.']}])
+        self.assertEqual([call[0] for call in calls], ['find', 'insert_many', 'find'])
+
+    def test_update(self):
+        def steps(collection):
+            _id = collection._insert({'title': 'b1', 'views': 1, 'comments': []})
+            collection._insert({'title': 'b2'})
+            return [
+                {'_id': str(_id), 'data': {'views': 2, 'comments': [{'content': 'c1'}]}, 'partial': True},
+                {'_id': str(_id), 'data': {'title': 'b2'}, 'partial': True},    # duplicate of other document
+            ]
+        calls, errors = self.assert_parity(steps)
+        self.assertEqual(errors, [{}, {'title': ['The title must be unique.']}])
+        self.assertIn('update_one', [call[0] for call in calls])
+
+    def test_update_many(self):
+        def steps(collection):
+            ids = [str(collection._insert({'title': f'b{index}', 'comments': []})) for index in range(3)]
+            return [
+                {'_id': ids, 'data': [{'views': index, 'comments': [{'content': f'c{index}'}]} for index in range(3)],
+                 'many': True, 'partial': True},
+                {'_id': ids[:2], 'data': [{'title': 'b1'}, {'title': 'b3'}], 'many': True, 'partial': True},
+            ]
+        calls, errors = self.assert_parity(steps)
+        self.assertEqual(errors, [[], [{'title': ['The title must be unique.']}, {}]])
+        self.assertEqual([call[0] for call in calls], ['bulk_write', 'find'])
+
+    def test_sync_methods_with_async_collection(self):
+        collection = AsyncMemoryCollection('db.blog')
+        serializer_class = get_serializer(collection)
+        serializer = serializer_class(data={'title': 'b1'})
+        with self.assertRaisesRegex(RuntimeError, 'async methods'):
+            serializer.is_valid()    # unique validator
+        _id = collection._insert({'title': 'b1'})
+        serializer = serializer_class(_id=str(_id), data={'views': 2}, partial=True)
+        self.assertTrue(serializer.is_valid())    # no db call
+        with self.assertRaisesRegex(RuntimeError, 'async methods'):
+            serializer.save()
+        self.assertEqual(collection.documents[0].get('views'), None)
+
+
+class WorkersParityTest(AsyncParityTest):
+    # items validated at once (threads in sync, greenlets in async), each by its own CallState
+    workers = 4
+
+
+if __name__ == '__main__':
+    unittest.main()